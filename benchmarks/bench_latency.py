@@ -0,0 +1,194 @@
+"""End-to-end latency harness: UDP datagram in, serial bytes out, no hardware.
+
+Each relay mode runs in a child process against a Linux pseudo-terminal that
+stands in for the serial port. This process sends sequence-tagged datagrams
+(`L0<seq>`) at a fixed rate, stamps each one with `perf_counter` as it is
+sent, and reads the pty master on a second thread, stamping every frame that
+comes out. Per mode it reports p50 / p99 / p99.9 latency, throughput and the
+coalescing ratio (datagrams per serial frame).
+
+    python benchmarks/bench_latency.py                        # every mode
+    python benchmarks/bench_latency.py async async-250hz --rate 1000 --count 5000
+    python benchmarks/bench_latency.py --json latency.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import pty
+import select
+import socket
+import sys
+import threading
+import time
+import tty
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+MODES = {
+    "thread": {},
+    "async": {"use_asyncio": True},
+    "thread-250hz": {"output_rate_hz": 250},
+    "async-250hz": {"use_asyncio": True, "output_rate_hz": 250},
+}
+# Sequence numbers travel as 4-digit L0 values.
+MAX_COUNT = 10000
+
+
+def _serve(pty_path: str, baud_rate: int, options: dict, port_queue):
+    """Child process: runs one relay on the pty and reports its UDP port."""
+    from udp_to_serial import UdpToSerialRelay
+    relay = UdpToSerialRelay("127.0.0.1", 0, pty_path, baud_rate, **options)
+    relay.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    relay.sock.bind(("127.0.0.1", 0))
+    relay.sock.setblocking(False)
+    port_queue.put(relay.sock.getsockname()[1])
+    relay.run()
+
+
+def percentile(sorted_values, fraction: float):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class PtyReader(threading.Thread):
+    """Collects (perf_counter, line) for every line the relay writes to the pty."""
+    def __init__(self, fd: int):
+        super().__init__(daemon=True)
+        self.fd = fd
+        self.lines = []
+        self.running = True
+
+    def wait_for_line(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.lines:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def run(self):
+        buf = b""
+        while self.running:
+            readable, _, _ = select.select([self.fd], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                chunk = os.read(self.fd, 65536)
+            except OSError:
+                break
+            now = time.perf_counter()
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            self.lines.extend((now, line) for line in lines)
+
+
+def measure(mode: str, count: int = 2000, rate: float = 500, baud_rate: int = 921600) -> dict:
+    """Runs one relay mode under load; returns latency (us), throughput and coalescing stats."""
+    if count > MAX_COUNT:
+        raise ValueError(f"count is limited to {MAX_COUNT} (4-digit sequence numbers)")
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    # Spawned, not forked: the relay gets a fresh interpreter (real pyserial, no
+    # inherited threads or module state from the measuring process).
+    context = multiprocessing.get_context("spawn")
+    port_queue = context.Queue()
+    proc = context.Process(target=_serve, args=(os.ttyname(slave), baud_rate, MODES[mode], port_queue),
+                           daemon=True)
+    proc.start()
+    reader = PtyReader(master)
+    reader.start()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        port = port_queue.get(timeout=10)
+        # The relay centers the device once the port is open; that is the ready signal.
+        if not reader.wait_for_line(10):
+            raise RuntimeError(f"{mode}: relay did not open the serial port")
+        time.sleep(0.1)
+        reader.lines.clear()
+
+        sent_at = [0.0] * count
+        period = 1.0 / rate
+        start = time.perf_counter()
+        for seq in range(count):
+            # Absolute send deadlines, so the offered load does not drift.
+            delay = start + seq * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sent_at[seq] = time.perf_counter()
+            sock.sendto(b"L0%04d\n" % seq, ("127.0.0.1", port))
+        send_time = time.perf_counter() - start
+        time.sleep(0.5)
+    finally:
+        reader.running = False
+        reader.join(timeout=1)
+        proc.terminate()
+        proc.join(timeout=2)
+        sock.close()
+        os.close(master)
+        os.close(slave)
+
+    latencies = []
+    frames = 0
+    out_bytes = 0
+    seen = set()
+    for received_at, line in reader.lines:
+        out_bytes += len(line) + 1
+        for token in line.split():
+            if token.startswith(b"L0") and token[2:6].isdigit():
+                frames += 1
+                seq = int(token[2:6])
+                if seq < count and seq not in seen:
+                    seen.add(seq)
+                    latencies.append((received_at - sent_at[seq]) * 1e6)
+                break
+    latencies.sort()
+    return {
+        "mode": mode,
+        "sent": count,
+        "frames": frames,
+        "p50_us": percentile(latencies, 0.50),
+        "p99_us": percentile(latencies, 0.99),
+        "p999_us": percentile(latencies, 0.999),
+        "max_us": latencies[-1] if latencies else None,
+        "in_per_s": count / send_time,
+        "out_frames_per_s": frames / send_time,
+        "out_bytes_per_s": out_bytes / send_time,
+        "coalescing_ratio": count / frames if frames else None,
+        # The last datagram must always make it out.
+        "last_delivered": count - 1 in seen,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UDP-to-serial end-to-end latency per relay mode.")
+    parser.add_argument("modes", nargs="*", help=f"modes to run (default: all of {', '.join(MODES)})")
+    parser.add_argument("--count", type=int, default=2000, help="datagrams per mode")
+    parser.add_argument("--rate", type=float, default=500, help="datagrams per second")
+    parser.add_argument("--baud", type=int, default=921600)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    unknown = [mode for mode in args.modes if mode not in MODES]
+    if unknown:
+        parser.error("unknown mode " + ", ".join(unknown))
+
+    results = []
+    print(f"{'mode':14} {'p50':>9} {'p99':>9} {'p99.9':>9} {'in/s':>8} {'frames/s':>9} {'coalesce':>9}")
+    for mode in args.modes or MODES:
+        r = measure(mode, args.count, args.rate, args.baud)
+        results.append(r)
+        fmt = lambda us: f"{us:7.0f}us" if us is not None else "        -"
+        ratio = f"{r['coalescing_ratio']:8.2f}x" if r["coalescing_ratio"] else "        -"
+        print(f"{mode:14} {fmt(r['p50_us'])} {fmt(r['p99_us'])} {fmt(r['p999_us'])} "
+              f"{r['in_per_s']:8.0f} {r['out_frames_per_s']:9.0f} {ratio}"
+              + ("" if r["last_delivered"] else "  LAST DATAGRAM LOST"))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(r["last_delivered"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
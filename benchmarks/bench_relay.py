@@ -0,0 +1,159 @@
+"""Benchmark suite for the relay's T-Code merge path.
+
+Times `UdpToSerialRelay.process_tcode_buffer` (and the tokenizer on its own)
+over named workloads with `timeit`: each benchmark is auto-ranged to a minimum
+run time and repeated, and the per-call min / median / mean / stdev are
+reported. Results can be saved as a JSON baseline and later runs compared
+against it; a median that got slower by more than the threshold (and by more
+than the baseline noise) is flagged as a regression and the exit status is 1.
+
+    python benchmarks/bench_relay.py                         # all benchmarks
+    python benchmarks/bench_relay.py burst_200 six_axis      # names or substrings
+    python benchmarks/bench_relay.py --save baseline.json
+    python benchmarks/bench_relay.py --compare baseline.json --threshold 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from udp_to_serial import AXIS_COUNT, UdpToSerialRelay, tokenize_tcode
+
+
+def _burst(count: int):
+    # Six axes with intervals, every value different, as a 200-packet Wi-Fi clump.
+    return [b"L0%04d L1%04d L2%04d R0%04d R1%04d R2%04dI20\n" % ((k * 37 % 10000,) * 6) for k in range(count)]
+
+
+WORKLOADS = {
+    "single_axis": [b"L05000\n"],
+    "six_axis": [b"L05000 L15000 L25000 R05000 R15000 R25000\n"],
+    "burst_200": _burst(200),
+    "mixed_case": [b"l0000\n", b"L1500 i100\n", b"l0999\n", b"R1200\n"],
+    "malformed": [b"L0\n", b"xx L05000 ##\n", b"R\n", b"\x00\xffV01234I\n", b"", b"A9", b"L1 5 0 0 0\n"],
+}
+
+
+def _merge_target(regex_parser: bool = False):
+    relay = UdpToSerialRelay("127.0.0.1", 0, "", 115200, dummy=True, regex_parser=regex_parser)
+    return relay.process_tcode_buffer
+
+
+def _tokenize_target():
+    slots = [None] * AXIS_COUNT
+
+    def tokenize(packets):
+        return tokenize_tcode(b"".join(packets), slots)
+    return tokenize
+
+
+# Benchmarks are named `<target>/<workload>`.
+TARGETS = {
+    "merge": _merge_target,
+    "merge_regex": lambda: _merge_target(regex_parser=True),
+    "tokenize": _tokenize_target,
+}
+
+
+def benchmark_names():
+    return [f"{target}/{workload}" for target in TARGETS for workload in WORKLOADS]
+
+
+def run_benchmark(name: str, repeat: int = 7, min_time: float = 0.2) -> dict:
+    """Times one benchmark; returns per-call statistics in nanoseconds."""
+    target, workload = name.split("/")
+    func = TARGETS[target]()
+    packets = WORKLOADS[workload]
+    timer = timeit.Timer(lambda: func(packets))
+    # Smallest loop count that runs for at least `min_time`, like `timeit.autorange`.
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    samples = [total / number * 1e9 for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min_ns": min(samples),
+        "median_ns": statistics.median(samples),
+        "mean_ns": statistics.fmean(samples),
+        "stdev_ns": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.1):
+    """Returns (name, ratio, status) per benchmark; status is `regression`, `faster`, `ok` or `new`.
+
+    A change only counts when the median moved by more than `threshold` (relative)
+    and by more than twice the baseline's run-to-run stdev.
+    """
+    report = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            report.append((name, None, "new"))
+            continue
+        ratio = result["median_ns"] / base["median_ns"]
+        change = result["median_ns"] - base["median_ns"]
+        significant = abs(change) > 2 * base.get("stdev_ns", 0.0)
+        if ratio > 1 + threshold and significant:
+            status = "regression"
+        elif ratio < 1 - threshold and significant:
+            status = "faster"
+        else:
+            status = "ok"
+        report.append((name, ratio, status))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relay merge-path benchmarks.")
+    parser.add_argument("names", nargs="*", help="benchmark names or substrings (default: all)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per repeat")
+    parser.add_argument("--save", metavar="JSON", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown that counts as a regression")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    args = parser.parse_args(argv)
+
+    names = benchmark_names()
+    if args.list:
+        print("\n".join(names))
+        return 0
+    if args.names:
+        names = [name for name in names if any(pattern in name for pattern in args.names)]
+        if not names:
+            parser.error("no benchmark matches " + ", ".join(args.names))
+
+    results = {}
+    print(f"{'benchmark':28} {'min':>10} {'median':>10} {'stdev':>9}   (per call)")
+    for name in names:
+        result = results[name] = run_benchmark(name, args.repeat, args.min_time)
+        print(f"{name:28} {result['min_ns'] / 1000:8.2f}us {result['median_ns'] / 1000:8.2f}us "
+              f"{result['stdev_ns'] / 1000:7.2f}us")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                       "results": results}, f, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    regressions = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        print(f"\nAgainst {args.compare} (threshold {args.threshold:.0%}):")
+        for name, ratio, status in compare(results, baseline, args.threshold):
+            shown = f"{ratio:6.2f}x" if ratio is not None else "      -"
+            print(f"{name:28} {shown}  {status.upper() if status == 'regression' else status}")
+            regressions += status == "regression"
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""T-Code firmware simulator serving a pseudo-terminal, as a stand-in OSR device.
+
+The relay opens the printed pty path like any serial port. The simulator drains
+it no faster than the configured baud rate (10 bits per byte), so a relay that
+writes too much fills the pty buffer and meets real backpressure. It parses
+T-Code lines, moves its axes with `I` (interval) and `S` (speed) semantics, and
+answers `D0`, `D1`, `D2` and `$B` after a firmware-like delay. Stalls (the device
+stops reading) and disconnects (the port disappears) can be injected to
+exercise the relay's writer and watchdog paths.
+
+    python osr_simulator.py --baud 115200
+    python osr_simulator.py --stall 0.5 --stall-every 5 --disconnect-after 60
+"""
+import argparse
+import logging
+import os
+import pty
+import re
+import select
+import threading
+import time
+import tty
+
+logger = logging.getLogger(__name__)
+
+# Axis token: name, fractional position digits, optional I/S parameter
+_AXIS_TOKEN = re.compile(br'([LRVA][0-9])([0-9]+)(?:([IS])([0-9]+))?')
+# Seconds between a query and its answer on an ESP32 OSR build
+REPLY_DELAYS = {b"D0": 0.002, b"D1": 0.002, b"D2": 0.005, b"$B": 0.03}
+DEFAULT_AXES = (b"L0", b"L1", b"L2", b"R0", b"R1", b"R2", b"V0", b"V1", b"A0", b"A1")
+
+
+class SimAxis:
+    """One axis moving linearly from `start` to `target` between `t0` and `t1` (positions 0.0-1.0)."""
+    def __init__(self, position: float = 0.5):
+        self.start = self.target = position
+        self.t0 = self.t1 = 0.0
+
+    def position(self, now: float) -> float:
+        if now >= self.t1:
+            return self.target
+        if now <= self.t0:
+            return self.start
+        return self.start + (self.target - self.start) * (now - self.t0) / (self.t1 - self.t0)
+
+    def move(self, target: float, now: float, interval: float = 0.0, speed: int = None):
+        """Starts a move from the current position; `speed` is in units (0-9999) per 100 ms."""
+        current = self.position(now)
+        if speed:
+            interval = abs(target - current) * 9999 / speed * 0.1
+        self.start, self.target = current, target
+        self.t0, self.t1 = now, now + interval
+
+    def stop(self, now: float):
+        self.start = self.target = self.position(now)
+        self.t0 = self.t1 = now
+
+
+class OsrSimulator:
+    """T-Code firmware model; `serve()` attaches it to a pty.
+
+    The protocol half (`receive`, `handle_line`, `position`) is independent of
+    the pty and of the wall clock, so it can be driven directly.
+    """
+    def __init__(self, baud_rate: int = 115200, axes=DEFAULT_AXES, firmware: str = "OSR2-sim",
+                 tcode_version: str = "TCode v0.3", battery: int = 100, reply_delays: dict = None,
+                 clock=time.monotonic):
+        self.baud_rate = baud_rate
+        self.axes = {name: SimAxis(0.0 if name[:1] == b"V" else 0.5) for name in axes}
+        self.firmware = firmware
+        self.tcode_version = tcode_version
+        self.battery = battery
+        self.reply_delays = dict(REPLY_DELAYS, **(reply_delays or {}))
+        self.clock = clock
+        self._partial = b""
+        # (due time, reply bytes), in due order
+        self.pending_replies = []
+        self.bytes_received = 0
+        self.lines = 0
+        self.moves = 0
+        self.errors = 0
+        # pty state
+        self.port = None
+        self.master = None
+        self.slave = None
+        self.running = False
+        self.thread = None
+        self.stalled_until = 0.0
+        self.stalls = 0
+
+    # --- Protocol ---
+
+    def position(self, axis: str, now: float = None) -> float:
+        """Current position of `axis` (e.g. "L0") as a fraction of its range."""
+        return self.axes[axis.encode()].position(self.clock() if now is None else now)
+
+    def receive(self, data: bytes, now: float = None):
+        """Consumes raw serial bytes; complete lines are executed."""
+        now = self.clock() if now is None else now
+        self.bytes_received += len(data)
+        *lines, self._partial = (self._partial + data).split(b"\n")
+        for line in lines:
+            self.handle_line(line, now)
+
+    def handle_line(self, line: bytes, now: float):
+        command = line.strip().replace(b" ", b"").upper()
+        if not command:
+            return
+        self.lines += 1
+        if command in self.reply_delays:
+            self._reply(command, self._query(command), now)
+        elif command == b"DSTOP":
+            for axis in self.axes.values():
+                axis.stop(now)
+        else:
+            # All axes of one line start moving together, as on the firmware.
+            tokens = _AXIS_TOKEN.findall(command)
+            if not tokens:
+                self.errors += 1
+                logger.debug(f"Simulator: unrecognised command {line!r}")
+            for name, digits, kind, param in tokens:
+                axis = self.axes.get(name)
+                if axis is None:
+                    self.errors += 1
+                    continue
+                target = int(digits) / 10 ** len(digits)
+                if kind == b"S":
+                    axis.move(target, now, speed=int(param))
+                else:
+                    axis.move(target, now, interval=int(param) / 1000 if param else 0.0)
+                self.moves += 1
+
+    def _query(self, command: bytes) -> bytes:
+        if command == b"D0":
+            return self.firmware.encode()
+        if command == b"D1":
+            return self.tcode_version.encode()
+        if command == b"D2":
+            return b"\r\n".join(name + (b" Vibe" if name[:1] == b"V" else b" Axis") for name in self.axes)
+        return b"$B:%d" % self.battery
+
+    def _reply(self, command: bytes, text: bytes, now: float):
+        self.pending_replies.append((now + self.reply_delays[command], text + b"\r\n"))
+        self.pending_replies.sort(key=lambda reply: reply[0])
+
+    def due_replies(self, now: float):
+        """Removes and returns the replies whose delay has elapsed."""
+        due = [text for at, text in self.pending_replies if at <= now]
+        if due:
+            self.pending_replies = self.pending_replies[len(due):]
+        return due
+
+    # --- Fault injection ---
+
+    def stall(self, seconds: float):
+        """Stops reading (and answering) for `seconds`, like a firmware hang."""
+        self.stalled_until = self.clock() + seconds
+        self.stalls += 1
+        logger.info(f"Simulator: stalled for {seconds:.3f}s")
+
+    def disconnect(self):
+        """Closes the pty; the relay's next read or write fails like an unplugged cable."""
+        self.running = False
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.master = self.slave = None
+        logger.info("Simulator: disconnected")
+
+    # --- pty ---
+
+    def serve(self) -> str:
+        """Opens the pty, starts the device thread and returns the port path to open."""
+        self.master, self.slave = pty.openpty()
+        # Raw mode: no echo or newline translation, like a USB CDC port. The slave
+        # end stays open here so the master keeps working while the relay reconnects.
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        logger.info(f"Simulator: serving {self.port} at {self.baud_rate} baud")
+        return self.port
+
+    def stop(self):
+        self.disconnect()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def _run(self):
+        bytes_per_second = self.baud_rate / 10
+        # The UART FIFO lets a few milliseconds worth of bytes through at once.
+        burst = max(1, int(bytes_per_second * 0.005))
+        budget = 0.0
+        last = self.clock()
+        while self.running:
+            now = self.clock()
+            if now < self.stalled_until:
+                time.sleep(min(self.stalled_until - now, 0.01))
+                last = self.clock()
+                continue
+            budget = min(budget + (now - last) * bytes_per_second, burst)
+            last = now
+            try:
+                for text in self.due_replies(now):
+                    os.write(self.master, text)
+                if budget < 1:
+                    time.sleep((1 - budget) / bytes_per_second)
+                    continue
+                timeout = 0.01
+                if self.pending_replies:
+                    timeout = max(0.0, min(timeout, self.pending_replies[0][0] - now))
+                readable, _, _ = select.select([self.master], [], [], timeout)
+                if not readable:
+                    continue
+                data = os.read(self.master, int(budget))
+            except (OSError, TypeError, ValueError):
+                # Closed by disconnect()
+                break
+            budget -= len(data)
+            self.receive(data, self.clock())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated T-Code (OSR) device on a pseudo-terminal.")
+    parser.add_argument("--baud", type=int, default=115200, help="rate at which commands are consumed")
+    parser.add_argument("--battery", type=int, default=100, help="percentage reported to $B")
+    parser.add_argument("--stall", type=float, default=0.0, help="stall duration in seconds")
+    parser.add_argument("--stall-every", type=float, default=0.0, help="seconds between stalls")
+    parser.add_argument("--disconnect-after", type=float, default=0.0, help="unplug after this many seconds")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+
+    sim = OsrSimulator(baud_rate=args.baud, battery=args.battery)
+    print(f"Open {sim.serve()} in the relay (Ctrl+C to quit)")
+    started = time.monotonic()
+    next_stall = started + args.stall_every
+    try:
+        while sim.running:
+            time.sleep(1.0)
+            now = time.monotonic()
+            if args.disconnect_after and now - started >= args.disconnect_after:
+                sim.disconnect()
+                break
+            if args.stall and args.stall_every and now >= next_stall:
+                sim.stall(args.stall)
+                next_stall = now + args.stall_every
+            positions = " ".join(f"{name.decode()}={axis.position(now):.3f}" for name, axis in sim.axes.items()
+                                 if name[:1] in b"LR")
+            print(f"{sim.lines} lines, {sim.bytes_received} bytes | {positions}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Optional per-stage instrumentation for the relay hot path.
+
+`Histogram` is an HDR-style log-linear histogram over non-negative integers
+(nanoseconds for stage timings): values below 16 get a bucket each, and every
+power of two above is split into 8 sub-buckets, so any recorded value is
+known to within 12.5% while the bucket array stays a fixed ~300 slots. A
+sample is one bit-length computation and one list increment; nothing grows.
+
+`RelayMetrics` bundles the stage histograms and counters. The relay only
+holds one when instrumentation is enabled, so the disabled cost is a `None`
+check per batch. Every histogram has a single writing thread; serial writes
+are recorded per device and only merged in `snapshot()`. `snapshot()` can be
+called from any thread: bucket arrays are copied in a single list slice
+(atomic under the GIL), so a snapshot is never torn within one histogram.
+
+`MetricsServer` serves a scrape callback as Prometheus text on an asyncio loop,
+and `PrometheusText` builds the exposition format.
+"""
+import asyncio
+import logging
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Values up to 2**40 ns (~18 minutes); larger ones land in the last bucket.
+MAX_VALUE_BITS = 40
+BUCKET_COUNT = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 1) * _SUB_BUCKETS
+
+# Relay stages, in pipeline order
+STAGES = ("receive", "merge", "ws_broadcast", "serial_write")
+
+
+def bucket_index(value: int) -> int:
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    if shift <= 0:
+        return value
+    return min(shift * _SUB_BUCKETS + (value >> shift), BUCKET_COUNT - 1)
+
+
+def bucket_bounds(index: int):
+    """(lowest, highest) value counted in bucket `index`."""
+    if index < 2 * _SUB_BUCKETS:
+        return index, index
+    shift = index // _SUB_BUCKETS - 1
+    low = (index % _SUB_BUCKETS + _SUB_BUCKETS) << shift
+    return low, low + (1 << shift) - 1
+
+
+class HistogramSnapshot(namedtuple("HistogramSnapshot", "count total max buckets")):
+    """Immutable copy of a `Histogram`; `buckets` is indexed like `bucket_index`."""
+    __slots__ = ()
+
+    def percentile(self, fraction: float) -> int:
+        """Upper bound of the bucket holding the `fraction` quantile (0 when empty)."""
+        if not self.count:
+            return 0
+        rank = max(1, int(fraction * self.count + 0.5))
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bucket_bounds(index)[1], self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+def merge_snapshots(snapshots) -> HistogramSnapshot:
+    """Sums snapshots bucket by bucket; an empty list gives an empty snapshot."""
+    buckets = [0] * BUCKET_COUNT
+    total = peak = 0
+    for snap in snapshots:
+        buckets = [a + b for a, b in zip(buckets, snap.buckets)]
+        total += snap.total
+        peak = max(peak, snap.max)
+    return HistogramSnapshot(sum(buckets), total, peak, tuple(buckets))
+
+
+class Histogram:
+    """Fixed-bucket log-linear histogram; see the module docstring."""
+    __slots__ = ("buckets", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int):
+        self.buckets[bucket_index(value)] += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> HistogramSnapshot:
+        buckets = self.buckets[:]
+        return HistogramSnapshot(sum(buckets), self.total, self.max, tuple(buckets))
+
+    def reset(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.total = 0
+        self.max = 0
+
+
+class RelayMetrics:
+    """Stage timings (ns) and traffic counters of one relay.
+
+    Every field is written by the thread that owns that stage: intake and merge
+    on the relay loop, serial writes by each device's writer into its own
+    `writer_histogram`.
+    """
+    def __init__(self):
+        self.stages = {name: Histogram() for name in STAGES if name != "serial_write"}
+        self.receive = self.stages["receive"]
+        self.merge = self.stages["merge"]
+        self.ws_broadcast = self.stages["ws_broadcast"]
+        # Device name -> serial write timings of that device's writer
+        self.serial_writes = {}
+        # Datagrams per drained batch
+        self.batch_size = Histogram()
+        self.packets = 0
+        self.batches = 0
+        self.bytes_in = 0
+        self.frames = 0
+        self.bytes_out = 0
+        self.watchdog_trips = 0
+        self.feedback_lines = 0
+        self.started = time.monotonic()
+
+    def writer_histogram(self, device: str) -> Histogram:
+        """The write-time histogram for `device`; each writer records into its own."""
+        return self.serial_writes.setdefault(device, Histogram())
+
+    def on_batch(self, packets: int, nbytes: int, elapsed_ns: int):
+        self.packets += packets
+        self.batches += 1
+        self.bytes_in += nbytes
+        self.batch_size.record(packets)
+        self.receive.record(elapsed_ns)
+
+    def on_frame(self, nbytes: int):
+        self.frames += 1
+        self.bytes_out += nbytes
+
+    def snapshot(self) -> dict:
+        """Counters and histogram snapshots; safe to call from any thread."""
+        snap = {
+            "uptime": time.monotonic() - self.started,
+            "packets": self.packets,
+            "batches": self.batches,
+            "bytes_in": self.bytes_in,
+            "frames": self.frames,
+            "bytes_out": self.bytes_out,
+            "watchdog_trips": self.watchdog_trips,
+            "feedback_lines": self.feedback_lines,
+            "batch_size": self.batch_size.snapshot(),
+            "stages": {name: hist.snapshot() for name, hist in self.stages.items()},
+            "serial_write": {device: hist.snapshot() for device, hist in list(self.serial_writes.items())},
+        }
+        snap["stages"]["serial_write"] = merge_snapshots(snap["serial_write"].values())
+        # Datagrams per frame written; > 1 means the merge coalesced them.
+        snap["merge_ratio"] = snap["packets"] / snap["frames"] if snap["frames"] else 0.0
+        return snap
+
+    def summary(self) -> str:
+        """One log line: merge ratio and p50/p99 per stage in microseconds."""
+        snap = self.snapshot()
+        parts = [f"{snap['packets']} packets, {snap['frames']} frames (x{snap['merge_ratio']:.2f})"]
+        for name, hist in snap["stages"].items():
+            if hist.count:
+                parts.append(f"{name} p50 {hist.percentile(0.5) / 1000:.1f}us p99 {hist.percentile(0.99) / 1000:.1f}us")
+        return ", ".join(parts)
+
+
+# Prometheus `le` bounds: stage timings in seconds, batch sizes in datagrams
+SECONDS_BOUNDS = (1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4, 1e-3, 2e-3, 5e-3,
+                  1e-2, 2e-2, 5e-2, 0.1, 0.2, 0.5, 1.0)
+COUNT_BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+class PrometheusText:
+    """Builds a Prometheus text exposition (format 0.0.4)."""
+    def __init__(self, prefix: str = "tcode_relay_"):
+        self.prefix = prefix
+        self.lines = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples):
+        """`samples` is a value or a list of (labels dict, value); empty lists are skipped."""
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        if not samples:
+            return
+        name = self.prefix + name
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {value}")
+
+    def histogram(self, name: str, help_text: str, snapshots, bounds, scale: float = 1.0):
+        """`snapshots` is a list of (labels dict, HistogramSnapshot); values are multiplied by `scale`.
+
+        A bucket counts toward `le` once its whole range is at or below it, so
+        cumulative counts never overstate how fast a stage was.
+        """
+        name = self.prefix + name
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, snap in snapshots:
+            cumulative = 0
+            index = 0
+            buckets = snap.buckets
+            for bound in bounds:
+                limit = bound / scale
+                while index < len(buckets) and bucket_bounds(index)[1] <= limit:
+                    cumulative += buckets[index]
+                    index += 1
+                self.lines.append(f"{name}_bucket{_labels(dict(labels, le=repr(float(bound))))} {cumulative}")
+            self.lines.append(f'{name}_bucket{_labels(dict(labels, le="+Inf"))} {snap.count}')
+            self.lines.append(f"{name}_sum{_labels(labels)} {snap.total * scale}")
+            self.lines.append(f"{name}_count{_labels(labels)} {snap.count}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+class MetricsServer:
+    """Minimal HTTP endpoint serving `collect()` (Prometheus text) at `/metrics`.
+
+    Runs on the caller's asyncio loop (`start_on_loop`). `collect` is only called
+    per scrape and should only read published counters and snapshots.
+    """
+    def __init__(self, collect, host: str = "127.0.0.1", port: int = 9100):
+        self.collect = collect
+        self.host = host
+        self.port = port
+        self.server = None
+        self.scrapes = 0
+
+    async def start_on_loop(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 binds an ephemeral port; report the real one.
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info(f"Metrics endpoint: http://{self.host}:{self.port}/metrics")
+
+    async def close_on_loop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Headers are read and ignored.
+            while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+                pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] in ("GET", "HEAD") and parts[1].split("?")[0] in ("/metrics", "/"):
+                self.scrapes += 1
+                body = self.collect().encode()
+                status = "200 OK"
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                body = b"Not found\n"
+                status = "404 Not Found"
+                content_type = "text/plain"
+            head = (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode()
+            writer.write(head if parts[:1] == ["HEAD"] else head + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            logger.debug(f"Metrics request failed: {e}")
+        except Exception as e:
+            logger.error(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
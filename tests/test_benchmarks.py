@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import MagicMock
+import importlib.machinery
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Mocking modules that might be missing in the environment
+def setup_mocks():
+    sys.modules['serial'] = MagicMock()
+    sys.modules['serial.tools'] = MagicMock()
+    sys.modules['serial.tools.list_ports'] = MagicMock()
+    sys.modules['websockets'] = MagicMock()
+
+setup_mocks()
+
+from bench_relay import WORKLOADS, benchmark_names, compare, run_benchmark
+from bench_latency import measure, percentile
+
+# The latency harness runs a real relay in a spawned process on a Linux pty.
+# PathFinder looks past the serial mock installed above.
+HAS_PTY_RELAY = sys.platform.startswith("linux") and importlib.machinery.PathFinder.find_spec("serial") is not None
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_every_workload_runs(self):
+        result = run_benchmark("merge/malformed", repeat=2, min_time=0.001)
+        self.assertGreater(result["median_ns"], 0)
+        self.assertEqual(len(benchmark_names()), 3 * len(WORKLOADS))
+        self.assertEqual(len(WORKLOADS["burst_200"]), 200)
+
+    def test_compare_flags_only_significant_slowdowns(self):
+        baseline = {
+            "merge/a": {"median_ns": 1000.0, "stdev_ns": 10.0},
+            "merge/b": {"median_ns": 1000.0, "stdev_ns": 200.0},
+            "merge/c": {"median_ns": 1000.0, "stdev_ns": 10.0},
+        }
+        results = {
+            "merge/a": {"median_ns": 1200.0},
+            # Slower, but within the baseline's own noise.
+            "merge/b": {"median_ns": 1200.0},
+            "merge/c": {"median_ns": 800.0},
+            "merge/d": {"median_ns": 500.0},
+        }
+        statuses = {name: status for name, _, status in compare(results, baseline, threshold=0.1)}
+        self.assertEqual(statuses, {"merge/a": "regression", "merge/b": "ok",
+                                    "merge/c": "faster", "merge/d": "new"})
+
+
+class TestLatencyHarness(unittest.TestCase):
+    def test_nearest_rank_percentiles(self):
+        values = list(range(1, 1001))
+        self.assertEqual(percentile(values, 0.50), 501)
+        self.assertEqual(percentile(values, 0.99), 991)
+        self.assertEqual(percentile(values, 0.999), 1000)
+        self.assertEqual(percentile([7], 0.999), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+    @unittest.skipUnless(HAS_PTY_RELAY, "needs a Linux pty and pyserial")
+    def test_smoke_run_delivers_every_sequence(self):
+        result = measure("async", count=20, rate=200)
+        self.assertTrue(result["last_delivered"])
+        self.assertGreater(result["frames"], 0)
+        self.assertLessEqual(result["frames"], 20)
+        self.assertIsNotNone(result["p99_us"])
+
+
+if __name__ == '__main__':
+    unittest.main()
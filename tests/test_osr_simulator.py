@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+import select
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from osr_simulator import OsrSimulator
+
+
+class TestOsrSimulatorProtocol(unittest.TestCase):
+    def setUp(self):
+        self.sim = OsrSimulator(clock=lambda: 0.0)
+
+    def test_interval_move_is_linear(self):
+        self.sim.receive(b"L09999I1000\n", now=0.0)
+        self.assertAlmostEqual(self.sim.position("L0", 0.0), 0.5)
+        self.assertAlmostEqual(self.sim.position("L0", 0.5), 0.74995)
+        self.assertAlmostEqual(self.sim.position("L0", 2.0), 0.9999)
+
+    def test_speed_move_and_fractional_digits(self):
+        # "R05" is 50%; 0 -> 50% at 500 units per 100 ms takes ~1 s.
+        self.sim.receive(b"R00\n", now=0.0)
+        self.sim.receive(b"R05 S500\n", now=0.0)
+        self.assertAlmostEqual(self.sim.position("R0", 0.5), 0.25, places=3)
+        self.assertAlmostEqual(self.sim.position("R0", 1.0), 0.5, places=3)
+
+    def test_move_starts_from_current_position_and_dstop_holds(self):
+        self.sim.receive(b"L00000 I1000\n", now=0.0)
+        self.sim.receive(b"L09 I1000\n", now=0.5)
+        self.assertAlmostEqual(self.sim.position("L0", 0.5), 0.25)
+        self.sim.receive(b"DSTOP\n", now=1.0)
+        self.assertAlmostEqual(self.sim.position("L0", 5.0), 0.575)
+
+    def test_lines_wait_for_newline(self):
+        self.sim.receive(b"L0000", now=0.0)
+        self.assertEqual(self.sim.moves, 0)
+        self.sim.receive(b"0 V15000\nxyz\n", now=0.0)
+        self.assertEqual(self.sim.moves, 2)
+        self.assertEqual(self.sim.position("L0", 0.0), 0.0)
+        self.assertEqual(self.sim.errors, 1)
+
+    def test_queries_are_answered_after_their_delay(self):
+        self.sim.battery = 42
+        self.sim.receive(b"D1\n$B\n", now=1.0)
+        self.assertEqual(self.sim.due_replies(1.0), [])
+        self.assertEqual(self.sim.due_replies(1.01), [b"TCode v0.3\r\n"])
+        self.assertEqual(self.sim.due_replies(1.1), [b"$B:42\r\n"])
+        self.assertEqual(self.sim.pending_replies, [])
+
+
+class TestOsrSimulatorPty(unittest.TestCase):
+    def setUp(self):
+        self.sim = OsrSimulator(baud_rate=9600)
+        self.port = self.sim.serve()
+        self.fd = os.open(self.port, os.O_RDWR | os.O_NOCTTY)
+
+    def tearDown(self):
+        self.sim.stop()
+        os.close(self.fd)
+
+    def read_line(self, timeout=1.0):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        return os.read(self.fd, 100) if readable else b""
+
+    def test_reply_over_pty(self):
+        os.write(self.fd, b"D0\n")
+        self.assertEqual(self.read_line(), b"OSR2-sim\r\n")
+
+    def test_consumes_at_baud_rate(self):
+        # 192 bytes at 960 bytes/s take ~0.2 s to drain.
+        started = time.monotonic()
+        os.write(self.fd, b"L05000 R05000 V00000\n" * 9 + b"D1\n")
+        self.assertEqual(self.read_line(), b"TCode v0.3\r\n")
+        self.assertGreater(time.monotonic() - started, 0.15)
+        self.assertEqual(self.sim.moves, 27)
+
+    def test_stall_delays_processing(self):
+        self.sim.stall(0.2)
+        started = time.monotonic()
+        os.write(self.fd, b"D0\n")
+        self.assertEqual(self.read_line(), b"OSR2-sim\r\n")
+        self.assertGreater(time.monotonic() - started, 0.15)
+
+    def test_disconnect_breaks_the_port(self):
+        self.sim.disconnect()
+        with self.assertRaises(OSError):
+            for _ in range(100):
+                os.write(self.fd, b"L05000\n" * 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
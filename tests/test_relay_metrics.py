@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+import threading
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from relay_metrics import BUCKET_COUNT, Histogram, PrometheusText, RelayMetrics, bucket_bounds, bucket_index, merge_snapshots
+
+
+class TestHistogram(unittest.TestCase):
+    def test_buckets_are_contiguous_and_bounded(self):
+        expected_low = 0
+        for index in range(BUCKET_COUNT):
+            low, high = bucket_bounds(index)
+            self.assertEqual(low, expected_low)
+            self.assertEqual(bucket_index(low), index)
+            self.assertEqual(bucket_index(high), index)
+            # Relative bucket width stays within 12.5%.
+            self.assertLessEqual(high - low, low / 8)
+            expected_low = high + 1
+        self.assertEqual(bucket_index(1 << 60), BUCKET_COUNT - 1)
+
+    def test_percentiles(self):
+        hist = Histogram()
+        for value in range(1, 1001):
+            hist.record(value * 1000)
+        snap = hist.snapshot()
+        self.assertEqual(snap.count, 1000)
+        self.assertEqual(snap.max, 1000000)
+        self.assertAlmostEqual(snap.mean, 500500)
+        for fraction, exact in ((0.5, 500000), (0.99, 990000)):
+            self.assertGreaterEqual(snap.percentile(fraction), exact)
+            self.assertLessEqual(snap.percentile(fraction), exact * 1.125)
+        self.assertEqual(snap.percentile(1.0), 1000000)
+        self.assertEqual(Histogram().snapshot().percentile(0.5), 0)
+
+    def test_snapshot_is_a_copy(self):
+        hist = Histogram()
+        hist.record(5)
+        snap = hist.snapshot()
+        hist.record(5)
+        self.assertEqual(snap.count, 1)
+        self.assertEqual(hist.snapshot().count, 2)
+        hist.reset()
+        self.assertEqual(hist.snapshot().count, 0)
+
+    def test_snapshots_while_recording(self):
+        metrics = RelayMetrics()
+        done = threading.Event()
+
+        def record():
+            for k in range(20000):
+                metrics.on_batch(1, 10, k)
+            done.set()
+
+        thread = threading.Thread(target=record)
+        thread.start()
+        counts = []
+        while not done.is_set():
+            counts.append(metrics.snapshot()["stages"]["receive"].count)
+        thread.join()
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(metrics.snapshot()["packets"], 20000)
+
+    def test_writer_histograms_are_merged_per_stage(self):
+        metrics = RelayMetrics()
+        self.assertEqual(metrics.snapshot()["stages"]["serial_write"].count, 0)
+        metrics.writer_histogram("A").record(1000)
+        metrics.writer_histogram("B").record(3000)
+        metrics.writer_histogram("B").record(5)
+        snap = metrics.snapshot()
+        self.assertEqual({device: hist.count for device, hist in snap["serial_write"].items()}, {"A": 1, "B": 2})
+        merged = snap["stages"]["serial_write"]
+        self.assertEqual((merged.count, merged.total, merged.max), (3, 4005, 3000))
+        self.assertEqual(merged, merge_snapshots(snap["serial_write"].values()))
+
+
+class TestPrometheusText(unittest.TestCase):
+    def test_counters_and_labels(self):
+        out = PrometheusText()
+        out.metric("frames_total", "counter", "Frames.", [({"device": 'A"1'}, 3)])
+        out.metric("unused", "gauge", "Nothing.", [])
+        self.assertEqual(out.text(), '# HELP tcode_relay_frames_total Frames.\n'
+                                     '# TYPE tcode_relay_frames_total counter\n'
+                                     'tcode_relay_frames_total{device="A\\"1"} 3\n')
+
+    def test_histogram_buckets_are_cumulative(self):
+        hist = Histogram()
+        for ns in (500, 1500, 1500, 3000000):
+            hist.record(ns)
+        out = PrometheusText()
+        out.histogram("stage_seconds", "Stages.", [({"stage": "merge"}, hist.snapshot())], (1e-6, 2e-6, 1e-3), 1e-9)
+        lines = out.text().splitlines()
+        self.assertEqual(lines[2:], [
+            'tcode_relay_stage_seconds_bucket{stage="merge",le="1e-06"} 1',
+            'tcode_relay_stage_seconds_bucket{stage="merge",le="2e-06"} 3',
+            'tcode_relay_stage_seconds_bucket{stage="merge",le="0.001"} 3',
+            'tcode_relay_stage_seconds_bucket{stage="merge",le="+Inf"} 4',
+            'tcode_relay_stage_seconds_sum{stage="merge"} 0.0030035',
+            'tcode_relay_stage_seconds_count{stage="merge"} 4',
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+import socket
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from udp_capture import CaptureWriter, read_capture, replay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestUdpCapture(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".tcap")
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def write_session(self):
+        capture = CaptureWriter(self.path)
+        ring = memoryview(bytearray(b"L0100\nR0200\n"))
+        capture.write(1_000_000_000, ("10.0.0.2", 5000), ring[:6])
+        capture.write(1_050_000_000, ("10.0.0.2", 5000), ring[6:])
+        capture.write(1_250_000_000, ("10.0.0.3", 6000), b"V0300\n")
+        capture.close()
+
+    def test_round_trip_and_new_session_replaces_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a capture at all")
+        self.write_session()
+        self.write_session()
+        records = list(read_capture(self.path))
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0], (1_000_000_000, ("10.0.0.2", 5000), b"L0100\n"))
+        self.assertEqual(records[2], (1_250_000_000, ("10.0.0.3", 6000), b"V0300\n"))
+
+    def test_truncated_record_is_ignored(self):
+        self.write_session()
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 2)
+        self.assertEqual(len(list(read_capture(self.path))), 2)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a capture at all")
+        with self.assertRaises(ValueError):
+            list(read_capture(self.path))
+
+    def test_replay_keeps_timing_scaled_by_speed(self):
+        self.write_session()
+        sock = MagicMock()
+        clock = FakeClock()
+        sent = replay(self.path, ("127.0.0.1", 8000), speed=2.0, sock=sock, clock=clock, sleep=clock.sleep)
+        self.assertEqual(sent, 3)
+        for expected, actual in zip((0.025, 0.1), clock.sleeps):
+            self.assertAlmostEqual(actual, expected)
+        sock.sendto.assert_called_with(b"V0300\n", ("127.0.0.1", 8000))
+
+    def test_replay_as_fast_as_possible(self):
+        self.write_session()
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(1)
+        try:
+            started = time.perf_counter()
+            self.assertEqual(replay(self.path, receiver.getsockname(), speed=0), 3)
+            self.assertLess(time.perf_counter() - started, 0.2)
+            self.assertEqual(receiver.recv(64), b"L0100\n")
+        finally:
+            receiver.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,13 @@ import unittest
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import socket
+import threading
+import time
+import random
+import re
+import tempfile
+import logging
 
 # Use absolute paths to ensure the module under test is importable
 # regardless of where the test is run from.
@@ -20,7 +27,11 @@ def setup_mocks():
 
 setup_mocks()
 
-from udp_to_serial import UdpToSerialRelay
+from udp_to_serial import (UdpToSerialRelay, OutputScheduler, SerialWriter, AxisTable, AxisInterpolator, JitterBuffer, IntervalMerger, SafetyWatchdog,
+                           AXIS_COUNT, UDP_MAX_DATAGRAM, AXIS_NAMES,
+                           REVERSE_SCAN_MIN, tokenize_tcode, tokenize_tcode_regex, parse_axis_routes,
+                           parse_merge_policies, TextHandler, start_log_listener, stop_log_listener,
+                           logger as relay_logger)
 
 class TestUdpToSerialRelay(unittest.TestCase):
     def setUp(self):
@@ -159,5 +170,859 @@ class TestUdpToSerialRelay(unittest.TestCase):
 
         self.assertTrue(any("Serial send failed: Write failed" in output for output in cm.output))
 
+    def test_asyncio_engine_relays_udp(self):
+        """Test that the asyncio engine forwards a datagram to the WS server"""
+        ws_server = MagicMock()
+        ws_server.running = True
+        relay = UdpToSerialRelay(self.udp_ip, 0, self.serial_port, self.baud_rate, dummy=True,
+                                 ws_server=ws_server, use_asyncio=True)
+        thread = threading.Thread(target=relay.run, daemon=True)
+        thread.start()
+        try:
+            for _ in range(200):
+                if relay.running:
+                    break
+                time.sleep(0.01)
+            sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sender.sendto(b"L0500 I100\n", relay.sock.getsockname())
+            sender.close()
+            for _ in range(200):
+                if ws_server.broadcast.called:
+                    break
+                time.sleep(0.01)
+            ws_server.broadcast.assert_called_with("L0500I100")
+        finally:
+            relay.running = False
+            thread.join(timeout=2)
+        self.assertFalse(thread.is_alive())
+
+    def test_drain_udp_reads_batch_into_ring(self):
+        """Test that queued datagrams are read back to back and tokenized as one batch"""
+        relay = UdpToSerialRelay(self.udp_ip, 0, self.serial_port, self.baud_rate, dummy=True)
+        relay.setup_connections()
+        # Small ring so the batch has to be tokenized and rewound mid-drain.
+        relay._rx_view = memoryview(bytearray(UDP_MAX_DATAGRAM + 16))
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for packet in (b"L0100 R1200\n", b"", b"L0300\n", b"V0400\n"):
+                sender.sendto(packet, relay.sock.getsockname())
+            time.sleep(0.05)
+            self.assertEqual(relay._drain_udp(), 3)
+            self.assertEqual(relay.last_udp_addr[1], sender.getsockname()[1])
+            self.assertEqual(relay.axes.emit(), b"L0300 R1200 V0400\n")
+            self.assertEqual(relay._drain_udp(), 0)
+        finally:
+            sender.close()
+            relay.sock.close()
+
+    def test_capture_records_every_datagram(self):
+        """Test that capture mode appends each datagram with its sender address"""
+        from udp_capture import read_capture
+        fd, path = tempfile.mkstemp(suffix=".tcap")
+        os.close(fd)
+        os.remove(path)
+        relay = UdpToSerialRelay(self.udp_ip, 0, self.serial_port, self.baud_rate, dummy=True, capture_path=path)
+        relay.setup_connections()
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for packet in (b"L0100\n", b"", b"R0200\n"):
+                sender.sendto(packet, relay.sock.getsockname())
+            time.sleep(0.05)
+            self.assertEqual(relay._drain_udp(), 2)
+            relay.cleanup()
+            records = list(read_capture(path))
+            self.assertEqual([payload for _, _, payload in records], [b"L0100\n", b"R0200\n"])
+            self.assertEqual(records[0][1][1], sender.getsockname()[1])
+        finally:
+            sender.close()
+            os.remove(path)
+
+    def test_metrics_count_batches_and_frames(self):
+        """Test that stage metrics record the drained batch, the merge and the frame"""
+        relay = UdpToSerialRelay(self.udp_ip, 0, self.serial_port, self.baud_rate, dummy=True, metrics=True)
+        relay.setup_connections()
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for packet in (b"L0100\n", b"L0200\n", b"R0300\n"):
+                sender.sendto(packet, relay.sock.getsockname())
+            time.sleep(0.05)
+            self.assertEqual(relay._drain_udp(), 3)
+            relay._on_batch()
+            snap = relay.metrics.snapshot()
+            self.assertEqual((snap["packets"], snap["batches"], snap["bytes_in"]), (3, 1, 18))
+            self.assertEqual((snap["frames"], snap["bytes_out"]), (1, len(b"L0200 R0300\n")))
+            self.assertEqual(snap["merge_ratio"], 3.0)
+            self.assertEqual(snap["batch_size"].max, 3)
+            self.assertEqual(snap["stages"]["receive"].count, 1)
+            self.assertEqual(snap["stages"]["merge"].count, 1)
+        finally:
+            sender.close()
+            relay.sock.close()
+
+    def test_metrics_endpoint_serves_prometheus_text(self):
+        """Test that the asyncio engine serves counters and histograms at /metrics"""
+        import urllib.request
+        relay = UdpToSerialRelay(self.udp_ip, 0, self.serial_port, self.baud_rate, dummy=True,
+                                 use_asyncio=True, metrics_port=0)
+        thread = threading.Thread(target=relay.run, daemon=True)
+        thread.start()
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            deadline = time.monotonic() + 5
+            while not (relay.metrics_server.server or time.monotonic() > deadline):
+                time.sleep(0.01)
+            sender.sendto(b"L0100 R0200\n", relay.sock.getsockname())
+            time.sleep(0.1)
+            url = f"http://127.0.0.1:{relay.metrics_server.port}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertIn("version=0.0.4", response.headers["Content-Type"])
+                text = response.read().decode()
+            self.assertIn("tcode_relay_packets_received_total 1\n", text)
+            self.assertIn('tcode_relay_watchdog_state{state="armed"} 1\n', text)
+            self.assertIn('tcode_relay_stage_seconds_bucket{stage="receive",le="+Inf"} 1\n', text)
+            self.assertIn("# TYPE tcode_relay_batch_packets histogram", text)
+        finally:
+            relay.running = False
+            thread.join(timeout=2)
+            sender.close()
+
+    def test_serial_write_timings_are_labelled_per_device(self):
+        """Test that each writer records into its own histogram, exported with a device label"""
+        relay = UdpToSerialRelay(self.udp_ip, 0, self.serial_port, self.baud_rate, metrics=True,
+                                 devices={"B": "COM2"})
+        relay.ser = relay.outputs[0].ser = MagicMock()
+        relay.outputs[1].ser = MagicMock()
+        relay._start_writer()
+        relay._start_devices()
+        try:
+            self.assertIsNot(relay.writer.write_time, relay.outputs[1].writer.write_time)
+            relay.outputs[1].writer.write_time.record(2000)
+            text = relay.metrics_text()
+            self.assertIn('tcode_relay_stage_seconds_count{stage="serial_write",device="B"} 1\n', text)
+            self.assertIn('tcode_relay_stage_seconds_count{stage="serial_write",device="A"} 0\n', text)
+        finally:
+            relay._stop_writer()
+
+    def test_metrics_endpoint_needs_asyncio(self):
+        with self.assertRaises(ValueError):
+            UdpToSerialRelay(self.udp_ip, 0, self.serial_port, self.baud_rate, dummy=True, metrics_port=0)
+
+    def test_priority_source_overrides_until_timeout(self):
+        """Test that a higher-priority source holds the axes it drives until it goes quiet"""
+        relay = UdpToSerialRelay(self.udp_ip, 0, self.serial_port, self.baud_rate, dummy=True,
+                                 sources=[(self.udp_ip, 0, 1)], source_timeout=0.1)
+        relay.setup_connections()
+        player, live = relay.sources
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sender.sendto(b"L0100 R0100\n", player.sock.getsockname())
+            sender.sendto(b"L0900\n", live.sock.getsockname())
+            time.sleep(0.05)
+            self.assertEqual(relay._drain_readable([player.sock, live.sock]), 2)
+            self.assertEqual(relay.axes.emit(), b"L0900 R0100\n")
+            self.assertIs(relay._reply_sock, live.sock)
+
+            # The player keeps R0 but is locked out of L0 while the live source is active.
+            sender.sendto(b"L0200 R0200\n", player.sock.getsockname())
+            time.sleep(0.05)
+            relay._drain_udp(player)
+            self.assertEqual(relay.axes.emit(), b"R0200\n")
+
+            time.sleep(0.1)
+            sender.sendto(b"L0300\n", player.sock.getsockname())
+            time.sleep(0.05)
+            relay._drain_udp(player)
+            self.assertEqual(relay.axes.emit(), b"L0300\n")
+        finally:
+            sender.close()
+            relay.cleanup()
+
+    def test_delta_output_sends_only_changes(self):
+        """Test that delta mode only forwards axes whose value changed"""
+        relay = UdpToSerialRelay(self.udp_ip, self.udp_port, self.serial_port, self.baud_rate,
+                                 dummy=True, delta_output=True)
+        self.assertEqual(relay.process_tcode_buffer([b"L0500 R1500\n"]), "L0500 R1500\n")
+        self.assertEqual(relay.process_tcode_buffer([b"L0500 R1600\n"]), "R1600\n")
+        self.assertIsNone(relay.process_tcode_buffer([b"L0500\n"]))
+
+    def test_manual_command_invalidates_delta_state(self):
+        """Test that an axis moved by a manual command is resent even if the stream value is unchanged"""
+        relay = UdpToSerialRelay(self.udp_ip, self.udp_port, self.serial_port, self.baud_rate,
+                                 delta_output=True)
+        relay.ser = MagicMock()
+        self.assertEqual(relay.process_tcode_buffer([b"L0500 R1500\n"]), "L0500 R1500\n")
+        relay.send_serial_cmd("L09999")
+        relay.ser.write.assert_called_once_with(b"L09999\n")
+        self.assertEqual(relay.process_tcode_buffer([b"L0500 R1500\n"]), "L0500\n")
+
+    def test_scheduler_collects_until_tick(self):
+        """Test that scheduled mode sends exactly one merged frame per tick"""
+        relay = UdpToSerialRelay(self.udp_ip, self.udp_port, self.serial_port, self.baud_rate,
+                                 dummy=True, output_rate_hz=100)
+        relay.ws_server = MagicMock()
+        relay.scheduler.start(0.0)
+        relay.axes.update(b"L0100\n")
+        relay._on_batch()
+        relay.axes.update(b"L0200\nR1300\n")
+        relay._on_batch()
+        relay.ws_server.broadcast.assert_not_called()
+
+        relay._on_tick(0.01)
+        relay.ws_server.broadcast.assert_called_once_with("L0200 R1300")
+        relay._on_tick(0.02)
+        self.assertEqual(relay.ws_server.broadcast.call_count, 1)
+        self.assertAlmostEqual(relay.scheduler.next_tick, 0.03)
+
+    def test_parse_axis_routes(self):
+        """Test route specs with remaps, default targets, wildcards and arrow variants"""
+        slot = {name.decode(): i for i, name in enumerate(AXIS_NAMES)}
+        routes = parse_axis_routes("L0>A:L0, L1→B:L0, r0 -> B")
+        self.assertEqual(routes, {"A": [(slot["L0"], slot["L0"])],
+                                  "B": [(slot["L1"], slot["L0"]), (slot["R0"], slot["R0"])]})
+        self.assertEqual(len(parse_axis_routes("*>B")["B"]), AXIS_COUNT)
+        with self.assertRaises(ValueError):
+            parse_axis_routes("L0:A")
+        with self.assertRaises(ValueError):
+            parse_axis_routes("X9>A")
+
+    @patch('udp_to_serial.socket.socket')
+    @patch('udp_to_serial.serial.Serial')
+    def test_failed_device_open_closes_primary_and_socket(self, mock_serial, mock_socket):
+        """Test that a secondary device failing to open releases the ports opened before it"""
+        relay = UdpToSerialRelay(self.udp_ip, self.udp_port, self.serial_port, self.baud_rate,
+                                 devices={"B": "COM2"})
+        primary = MagicMock()
+        mock_serial.side_effect = [primary, Exception("COM2 busy")]
+
+        with self.assertRaises(Exception):
+            relay.setup_connections()
+        primary.close.assert_called()
+        mock_socket.return_value.close.assert_called()
+        self.assertIsNone(relay.ser)
+        self.assertIsNone(relay.sock)
+
+    def test_fan_out_routes_axes_per_device(self):
+        """Test that one merge feeds every device its routed axes in the same tick"""
+        relay = UdpToSerialRelay(self.udp_ip, self.udp_port, self.serial_port, self.baud_rate,
+                                 devices={"B": "COM2"}, routes="L0>A:L0, L1>B:L0, V0>A, V0>B",
+                                 output_rate_hz=100)
+        dev_a, dev_b = relay.outputs
+        relay.ser = dev_a.ser = MagicMock()
+        dev_b.ser = MagicMock()
+        relay.scheduler.start(0.0)
+        relay.axes.update(b"L0100 L1900 V0500\nL0200\n")
+        relay._on_batch()
+        dev_a.ser.write.assert_not_called()
+
+        relay._on_tick(0.01)
+        dev_a.ser.write.assert_called_once_with(b"L0200 V0500\n")
+        dev_b.ser.write.assert_called_once_with(b"L0900 V0500\n")
+
+        relay.send_serial_cmd("D0")
+        dev_b.ser.write.assert_called_with(b"D0\n")
+        with self.assertRaises(ValueError):
+            UdpToSerialRelay(self.udp_ip, self.udp_port, self.serial_port, self.baud_rate, routes="L0>C")
+
+
+class TestOutputScheduler(unittest.TestCase):
+    def test_fixed_cadence(self):
+        scheduler = OutputScheduler(50, 921600)
+        scheduler.start(0.0)
+        self.assertAlmostEqual(scheduler.timeout(0.005), 0.015)
+        scheduler.advance(0.02, 10)
+        self.assertAlmostEqual(scheduler.next_tick, 0.04)
+
+    def test_resyncs_after_stall(self):
+        scheduler = OutputScheduler(100, 921600)
+        scheduler.start(0.0)
+        scheduler.advance(0.5)
+        self.assertAlmostEqual(scheduler.next_tick, 0.51)
+
+    def test_baud_budget_caps_rate(self):
+        # 115 bytes at 115200 baud take ~10 ms, longer than a 500 Hz tick.
+        scheduler = OutputScheduler(500, 115200)
+        scheduler.start(0.0)
+        scheduler.advance(0.002, 115)
+        self.assertAlmostEqual(scheduler.next_tick, 0.002 + 115 * 10 / 115200)
+        self.assertAlmostEqual(scheduler.max_rate(115), 115200 / 1150)
+
+LEGACY_REGEX = re.compile(br'([a-zA-Z][0-9])([0-9]+(?:[ISis][0-9]+)?)')
+
+def legacy_axis_state(packets):
+    """Reference: the regex/dict merge `process_tcode_buffer` used before the tokenizer."""
+    axis_state = dict(LEGACY_REGEX.findall(b"".join(packets).replace(b" ", b"")))
+    merged = {axis.upper(): value.upper() for axis, value in axis_state.items()}
+    return {axis: value for axis, value in merged.items() if axis[:1] in b"LRVA"}
+
+def random_packet(rng, cases):
+    parts = []
+    for _ in range(rng.randint(1, 6)):
+        kind = rng.random()
+        if kind < 0.75:
+            axis = rng.choice("LRVA") + str(rng.randint(0, 9))
+            token = cases.setdefault(axis, rng.choice([axis, axis.lower()])) + str(rng.randint(0, 99999))
+            if rng.random() < 0.3:
+                token += rng.choice("IiSs") + str(rng.randint(0, 9999))
+        elif kind < 0.9:
+            token = rng.choice(["D0", "$B", "DSTOP", "X", "#", "I", "L", "V0", "R1a"])
+        else:
+            token = rng.choice("BCXYZ") + str(rng.randint(0, 999))
+        parts.append(token)
+    return (rng.choice([" ", "", "  "]).join(parts) + rng.choice(["\n", "", "\r\n"])).encode()
+
+
+class TestTCodeTokenizer(unittest.TestCase):
+    def tokenize(self, tokenizer, packets):
+        slots = [None] * AXIS_COUNT
+        found = tokenizer(b"".join(packets), slots)
+        return {AXIS_NAMES[slot]: slots[slot] for slot in range(AXIS_COUNT) if found >> slot & 1}
+
+    def test_differential_against_regex_merge(self):
+        """Test both tokenizers against the legacy regex merge on random traffic"""
+        rng = random.Random(1234)
+        for _ in range(400):
+            cases = {}
+            # Bursts large enough to exercise both the forward and the reverse scan.
+            packets = [random_packet(rng, cases) for _ in range(rng.choice([1, 2, 6, 40]))]
+            expected = legacy_axis_state(packets)
+            self.assertEqual(self.tokenize(tokenize_tcode, packets), expected, packets)
+            self.assertEqual(self.tokenize(tokenize_tcode_regex, packets), expected, packets)
+
+    def test_reverse_scan_on_large_burst(self):
+        """Test that a burst above REVERSE_SCAN_MIN keeps the last value per axis"""
+        packets = [b"L0%04d I20\n" % i for i in range(200)] + [b"R1%04d\n" % i for i in range(200)]
+        self.assertGreater(len(b"".join(packets)), REVERSE_SCAN_MIN)
+        slots = [None] * AXIS_COUNT
+        found = tokenize_tcode(memoryview(b"".join(packets)), slots)
+        self.assertEqual(found, (1 << 0) | (1 << 11))
+        self.assertEqual(slots[0], b"0199I20")
+        self.assertEqual(slots[11], b"0199")
+
+    def test_mixed_case_axis_merges(self):
+        """Test that `l0` and `L0` are the same axis (the regex dict kept both)"""
+        result = UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, dummy=True,
+                                  regex_parser=True).process_tcode_buffer([b"L0200 l0100 L0300\n"])
+        self.assertEqual(result, "L0300\n")
+        result = UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, dummy=True).process_tcode_buffer(
+            [b"L0200 l0100 L0300\n"])
+        self.assertEqual(result, "L0300\n")
+
+    def test_lowercase_and_spaces_normalized_from_any_buffer(self):
+        """Test that both tokenizers uppercase and drop spaces for bytes, bytearray and memoryview input"""
+        data = b"l0 200i5 0 r1300 s20\n" * (REVERSE_SCAN_MIN // 10)
+        for tokenize in (tokenize_tcode, tokenize_tcode_regex):
+            for buf in (data, bytearray(data), memoryview(bytearray(data)), data[:21]):
+                slots = [None] * AXIS_COUNT
+                self.assertEqual(tokenize(buf, slots), (1 << 0) | (1 << 11))
+                self.assertEqual((slots[0], slots[11]), (b"200I50", b"300S20"))
+                self.assertIs(type(slots[0]), bytes)
+
+
+class TestAxisTable(unittest.TestCase):
+    def test_emits_axes_updated_since_last_emit(self):
+        table = AxisTable()
+        table.update(b"L0100 R1200\n")
+        self.assertEqual(table.emit(), b"L0100 R1200\n")
+        self.assertIsNone(table.emit())
+        table.update(b"R1200\n")
+        self.assertEqual(table.emit(), b"R1200\n")
+
+    def test_delta_skips_unchanged_axes(self):
+        table = AxisTable(delta=True)
+        table.update(b"L0100 R1200 V0300\n")
+        table.emit()
+        table.update(b"L0100 R1250 V0300\n")
+        self.assertEqual(table.emit(), b"R1250\n")
+        table.update(b"L0100\n")
+        self.assertIsNone(table.emit())
+
+    def test_periodic_full_refresh(self):
+        table = AxisTable(delta=True, refresh_interval=1.0)
+        with patch('udp_to_serial.time.monotonic', side_effect=[10.0, 10.5, 11.0]):
+            table.update(b"L0100 R1200\n")
+            self.assertEqual(table.emit(), b"L0100 R1200\n")
+            table.update(b"L0100\n")
+            self.assertIsNone(table.emit())
+            self.assertEqual(table.emit(), b"L0100 R1200\n")
+
+
+class TestAxisInterpolator(unittest.TestCase):
+    def setUp(self):
+        self.slots = [None] * AXIS_COUNT
+        self.l0 = AXIS_NAMES.index(b"L0")
+
+    def target(self, interp, value, now):
+        self.slots[self.l0] = value
+        interp.add(1 << self.l0, self.slots, now)
+
+    def test_linear_reaches_target_one_interval_later(self):
+        interp = AxisInterpolator("linear")
+        self.target(interp, b"1000", 0.0)
+        self.assertEqual(interp.emit(0.0), b"L01000\n")
+        self.target(interp, b"3000I100", 0.1)
+        self.assertEqual(interp.emit(0.1), b"L01000\n")
+        self.assertEqual(interp.emit(0.15), b"L02000\n")
+        self.assertEqual(interp.emit(0.2), b"L03000\n")
+        # Settled: nothing more to send until the next target.
+        self.assertIsNone(interp.emit(0.25))
+
+    def test_early_target_continues_from_current_position(self):
+        interp = AxisInterpolator("linear")
+        self.target(interp, b"0000", 0.0)
+        self.target(interp, b"4000", 0.1)
+        self.assertEqual(interp.emit(0.15), b"L02000\n")
+        # Next target arrives halfway through the move: no jump back or forward.
+        self.target(interp, b"2000", 0.15)
+        self.assertEqual(interp.emit(0.15), b"L02000\n")
+        self.assertEqual(interp.emit(0.2), b"L02000\n")
+
+    def test_cubic_is_smooth_and_hits_knots(self):
+        interp = AxisInterpolator("cubic")
+        positions = []
+        for k, value in enumerate((b"1000", b"2000", b"3000", b"4000")):
+            self.target(interp, value, k * 0.1)
+            interp.emit(k * 0.1)
+        for step in range(11):
+            frame = interp.emit(0.3 + step * 0.01)
+            if frame:
+                positions.append(int(frame[2:-1]))
+        # Constant velocity input stays a straight, monotonic ramp.
+        self.assertEqual(positions[-1], 4000)
+        self.assertEqual(positions, sorted(positions))
+        self.assertAlmostEqual(positions[5], 3500, delta=50)
+
+    def test_relay_renders_at_tick_rate(self):
+        relay = UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, dummy=True,
+                                 output_rate_hz=100, interpolation="linear")
+        relay.ws_server = MagicMock()
+        relay.axes.update(b"L00000\n")
+        relay._on_batch()
+        relay._on_tick(time.monotonic())
+        relay.ws_server.broadcast.assert_called_once_with("L00000")
+        self.assertEqual(relay.output_axes, relay.interpolator.out)
+        with self.assertRaises(ValueError):
+            UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, interpolation="linear")
+
+
+class TestJitterBuffer(unittest.TestCase):
+    def test_clump_is_spread_out_at_sender_period(self):
+        buf = JitterBuffer(delay=0.05)
+        for k in range(4):
+            buf.push(b"L0%d\n" % k, None, k * 0.02)
+        self.assertAlmostEqual(buf.period, 0.02)
+        # Three datagrams arrive at once after a stall.
+        for k in range(4, 7):
+            buf.push(b"L0%d\n" % k, None, 0.2)
+        self.assertEqual(buf.depth, 7)
+        self.assertEqual([p for p, _ in buf.pop_due(0.111)], [b"L00\n", b"L01\n", b"L02\n", b"L03\n"])
+        self.assertEqual(len(buf.pop_due(0.25)), 1)
+        self.assertEqual(buf.depth, 2)
+        # The rest follow about one period apart instead of all at once.
+        self.assertEqual(len(buf.pop_due(0.28)), 1)
+        self.assertEqual(len(buf.pop_due(0.31)), 1)
+
+    def test_adaptive_delay_tracks_jitter(self):
+        buf = JitterBuffer(adaptive=True, min_delay=0.005, max_delay=0.2)
+        now = 0.0
+        for _ in range(50):
+            now += 0.02
+            buf.push(b"L05000\n", None, now)
+        steady = buf.delay
+        self.assertEqual(steady, 0.005)
+        for k in range(50):
+            now += 0.0 if k % 3 else 0.06
+            buf.push(b"L05000\n", None, now)
+        self.assertGreater(buf.delay, steady)
+        self.assertLessEqual(buf.delay, 0.2)
+        self.assertGreater(buf.stats()["jitter"], 0)
+
+    def test_max_depth_plays_oldest_at_once(self):
+        buf = JitterBuffer(delay=0.1, max_depth=2)
+        for _ in range(3):
+            buf.push(b"L05000\n", None, 1.0)
+        self.assertEqual(len(buf.pop_due(1.0)), 1)
+
+    def test_relay_holds_datagrams_until_playout(self):
+        relay = UdpToSerialRelay("127.0.0.1", 0, "COM1", 115200, dummy=True,
+                                 output_rate_hz=100, jitter_delay=0.05)
+        relay.setup_connections()
+        relay.ws_server = MagicMock()
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for value in (b"L0100\n", b"L0200\n"):
+                sender.sendto(value, relay.sock.getsockname())
+                time.sleep(0.03)
+                self.assertEqual(relay._drain_udp(), 1)
+                relay._on_batch()
+            first_play = relay.jitter.queue[0][0]
+            relay._on_tick(first_play - 0.001)
+            relay.ws_server.broadcast.assert_not_called()
+            relay._on_tick(first_play)
+            relay.ws_server.broadcast.assert_called_once_with("L0100")
+            self.assertEqual(relay.jitter.depth, 1)
+        finally:
+            sender.close()
+            relay.sock.close()
+
+
+class TestIntervalMerger(unittest.TestCase):
+    def table(self, spec):
+        return AxisTable(merger=IntervalMerger(parse_merge_policies(spec)))
+
+    def test_velocity_keeps_travel_time_of_burst(self):
+        table = self.table("L0=velocity")
+        table.update(b"L01000I30 L02000I30\nL03000I30\nR05000I30\n")
+        # R0 has no policy and stays last-wins.
+        self.assertEqual(table.emit(), b"L03000I90 R05000I30\n")
+        table.update(b"L04000I30\n")
+        self.assertEqual(table.emit(), b"L04000I30\n")
+
+    def test_average_interval_and_speed(self):
+        table = self.table("L0=average, R0=average")
+        table.update(b"L01000I20 L02000I40 L03000I90 R01000S100 R02000S300\n")
+        self.assertEqual(table.emit(), b"L03000I50 R02000S200\n")
+
+    def test_velocity_keeps_final_speed(self):
+        table = self.table("*=velocity")
+        table.update(b"V01000S100 V02000S300\n")
+        self.assertEqual(table.emit(), b"V02000S300\n")
+
+    def test_parse_errors(self):
+        with self.assertRaises(ValueError):
+            parse_merge_policies("L0=fastest")
+        with self.assertRaises(ValueError):
+            parse_merge_policies("Q0=last")
+        self.assertEqual(parse_merge_policies("l0 = Velocity"), {AXIS_NAMES.index(b"L0"): "velocity"})
+
+    def test_relay_applies_policies_across_batches(self):
+        relay = UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, dummy=True,
+                                 output_rate_hz=100, merge_policies="L0=velocity")
+        relay.ws_server = MagicMock()
+        relay.scheduler.start(0.0)
+        for packet in (b"L01000I33\n", b"L02000I33\n"):
+            relay.axes.update(packet, relay.tokenize)
+            relay._on_batch()
+        relay._on_tick(0.01)
+        relay.ws_server.broadcast.assert_called_once_with("L02000I66")
+
+    def test_losing_source_does_not_skew_intervals(self):
+        """Test that only the suffixes of commands that won arbitration are merged"""
+        relay = UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, dummy=True, sources=[("127.0.0.1", 0, 1)],
+                                 merge_policies="L0=velocity")
+        player, live = relay.sources
+        self.assertIsNot(player.axes.merger, live.axes.merger)
+        live.axes.update(b"L09000I20\n")
+        relay._commit_source(live)
+        # The player is locked out of L0 while the live source drives it.
+        player.axes.update(b"L01000I500 L02000I500\n")
+        relay._commit_source(player)
+        live.axes.update(b"L08000I20\n")
+        relay._commit_source(live)
+        self.assertEqual(relay.axes.emit(), b"L08000I40\n")
+        self.assertEqual(player.axes.merger.counts[0], 0)
+
+    def test_single_pass_tokenizer_matches_tokenize_tcode(self):
+        merger = IntervalMerger(parse_merge_policies("L0=average"))
+        data = b"l0 1000i20 R1500 xx L02000S40 V0\n"
+        slots, expected = [None] * AXIS_COUNT, [None] * AXIS_COUNT
+        self.assertEqual(merger.tokenize(data, slots), tokenize_tcode(data, expected))
+        self.assertEqual(slots, expected)
+        self.assertEqual((merger.counts[0], merger.speed_counts[0]), (1, 1))
+
+    def test_policies_rejected_with_interpolation(self):
+        with self.assertRaises(ValueError):
+            UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, dummy=True, output_rate_hz=100,
+                             interpolation="linear", merge_policies="L0=velocity")
+
+
+class TestSafetyWatchdog(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.watchdog = SafetyWatchdog(timeout=2.0, hold_time=1.0, ramp_time=2.0,
+                                       on_hold=lambda: self.events.append("hold"),
+                                       on_ramp=lambda t: self.events.append(("ramp", t)),
+                                       on_stop=lambda: self.events.append("stop"),
+                                       on_restore=lambda: self.events.append("restore"))
+
+    def test_tiers_in_order(self):
+        wd = self.watchdog
+        wd.fed = True
+        for now in (0.0, 1.9, 2.0, 2.5, 3.0, 4.9, 5.0, 9.0):
+            wd.poll(now)
+        self.assertEqual(self.events, ["hold", ("ramp", 2.0), "stop"])
+        self.assertEqual(wd.state, SafetyWatchdog.STOP)
+
+    def test_feed_keeps_armed_and_restores(self):
+        wd = self.watchdog
+        for now in range(10):
+            wd.fed = True
+            wd.poll(float(now))
+        self.assertEqual(self.events, [])
+        wd.poll(12.0)
+        wd.fed = True
+        wd.poll(12.1)
+        self.assertEqual(self.events, ["hold", "restore"])
+        self.assertEqual(wd.state, SafetyWatchdog.ARMED)
+
+    def test_threaded_engine_runs_tiers_and_commands_on_relay_thread(self):
+        """Test that watchdog tiers and commands from other threads never touch the tables off the relay thread"""
+        relay = UdpToSerialRelay("127.0.0.1", 0, "COM1", 115200, dummy=True, watchdog_timeout=0.05)
+        threads = {}
+        relay._watchdog_hold = lambda: threads.setdefault("hold", threading.get_ident())
+        relay.watchdog.on_hold = relay._watchdog_hold
+        relay._write_command = lambda data: threads.setdefault("command", (threading.get_ident(), data))
+        relay_thread = threading.Thread(target=relay.run, daemon=True)
+        relay_thread.start()
+        try:
+            for _ in range(200):
+                if relay._relay_thread_id:
+                    break
+                time.sleep(0.01)
+            relay.dummy = False
+            relay.ser = MagicMock()
+            relay.send_serial_cmd("D0")
+            for _ in range(200):
+                if len(threads) == 2:
+                    break
+                time.sleep(0.01)
+        finally:
+            relay.running = False
+            relay_thread.join(timeout=2)
+        self.assertEqual(threads["hold"], relay_thread.ident)
+        self.assertEqual(threads["command"], (relay_thread.ident, b"D0\n"))
+
+    def test_relay_ramps_known_axes_to_center(self):
+        relay = UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, delta_output=True, watchdog_ramp=1.5)
+        relay.ser = MagicMock()
+        relay.axes.update(b"L02000 R19000 V07000\n")
+        relay._emit_frame(relay.axes.emit())
+        for now in (0.0, 2.0, 3.0, 4.5):
+            relay.watchdog.poll(now)
+        writes = [c.args[0] for c in relay.ser.write.call_args_list]
+        # Vibration stops with the hold; the stop tier repeats it after the ramp.
+        self.assertEqual(writes[1:], [b"V00000\n", b"L05000I1500 R15000I1500\n", b"V00000\n"])
+        # The next frame after recovery is sent in full, even with delta output.
+        relay.axes.update(b"L02000 R19000 V07000\n")
+        self.assertEqual(relay.axes.emit(), b"L02000 R19000 V07000\n")
+
+    def test_refresh_does_not_undo_the_watchdog(self):
+        """Test that refresh ticks after signal loss never resend the pre-loss positions"""
+        relay = UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, output_rate_hz=50,
+                                 delta_output=True, full_refresh_interval=0.2)
+        relay.ser = MagicMock()
+        relay.axes.update(b"L09000 V09999\n")
+        relay._on_tick(0.0)
+        for now in (0.0, 2.0, 3.0, 5.0):
+            relay.watchdog.poll(now)
+        # Tick through several refresh intervals with no input.
+        base = time.monotonic()
+        with patch('udp_to_serial.time.monotonic') as clock:
+            for step in range(1, 20):
+                clock.return_value = base + step * 0.1
+                relay._on_tick(5.0 + step * 0.1)
+        writes = [c.args[0] for c in relay.ser.write.call_args_list]
+        self.assertEqual(writes, [b"L09000 V09999\n", b"V00000\n", b"L05000I2000\n", b"V00000\n"])
+        self.assertEqual((relay.axes.values[0], relay.axes.sent[0]), (b"5000", b"5000"))
+        self.assertEqual(relay.axes.sent[20], b"0000")
+        # Once the signal is back, refreshes resume.
+        relay.axes.update(b"L09000\n")
+        relay.watchdog.fed = True
+        relay.watchdog.poll(7.0)
+        relay._on_tick(7.0)
+        self.assertEqual(relay.ser.write.call_args.args[0], b"L09000\n")
+        with patch('udp_to_serial.time.monotonic', return_value=time.monotonic() + 10):
+            relay._on_tick(7.5)
+        self.assertEqual(relay.ser.write.call_args.args[0], b"L09000 V00000\n")
+
+    def test_interpolation_resumes_from_center_after_ramp(self):
+        """Test that the first target after recovery is interpolated from where the ramp left the axis"""
+        relay = UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, output_rate_hz=100, interpolation="linear")
+        relay.ser = MagicMock()
+        with patch('udp_to_serial.time.monotonic', return_value=100.0):
+            relay.axes.update(b"L09000\n")
+            relay._feed_interpolator(99.9)
+            relay._on_tick(99.9)
+            relay._watchdog_ramp(2.0)
+            relay.axes.update(b"L01000\n")
+            relay._feed_interpolator(110.0)
+        relay._on_tick(110.0 + relay.interpolator.max_interval / 2)
+        # Half way from 5000 (not from the stale 9000) to 1000
+        self.assertEqual(relay.interpolator.out.values[0], b"3000")
+
+
+class TestSerialWriter(unittest.TestCase):
+    def setUp(self):
+        self.relay = UdpToSerialRelay("127.0.0.1", 8000, "COM1", 115200, dummy=True)
+        self.ser = MagicMock()
+        self.writer = SerialWriter(self.ser, merge=self.relay._merge_frames)
+
+    def test_latest_frame_wins_without_losing_axes(self):
+        """Test that an unsent frame is replaced, merged and counted as dropped"""
+        self.writer.submit(b"L0100 R1200\n")
+        self.writer.submit(b"L0300\n")
+        self.assertEqual(self.writer.frames_dropped, 1)
+        self.assertEqual(self.writer._take(), b"L0300 R1200\n")
+
+    def test_commands_are_queued_ahead_of_frames(self):
+        """Test that control commands are never dropped and go out first"""
+        self.writer.submit(b"L0100\n")
+        self.writer.send(b"D0\n")
+        self.writer.send(b"$B\n")
+        self.assertEqual(self.writer._take(), b"D0\n")
+        self.assertEqual(self.writer._take(), b"$B\n")
+        self.assertEqual(self.writer._take(), b"L0100\n")
+        self.assertIsNone(self.writer._take())
+
+    def test_thread_writes_submitted_frames(self):
+        """Test that the writer thread drains the mailbox to the port"""
+        self.ser.out_waiting = 0
+        self.writer.start()
+        try:
+            self.writer.submit(b"L0500\n")
+            for _ in range(200):
+                if self.writer.frames_written:
+                    break
+                time.sleep(0.01)
+        finally:
+            self.writer.stop()
+        self.ser.write.assert_called_with(b"L0500\n")
+        self.assertEqual(self.writer.frames_written, 1)
+
+    def test_async_partial_writes_keep_byte_order(self):
+        """Test that the non-blocking writer keeps unsent bytes and drains the mailbox after them"""
+        loop = MagicMock()
+        self.writer.attach(loop, 42)
+        with patch('udp_to_serial.os.write', side_effect=[3, BlockingIOError(), 3, 6]) as mock_write:
+            self.writer.submit(b"L0500\n")
+            self.writer.submit(b"R1200\n")
+            loop.add_writer.assert_called_once_with(42, self.writer._on_writable)
+            self.assertEqual(bytes(self.writer._tx), b"00\n")
+            self.assertEqual(self.writer.out_waiting, 3)
+            self.writer._on_writable()
+            self.writer._on_writable()
+        self.assertEqual(mock_write.call_args_list[-1][0], (42, b"R1200\n"))
+        self.assertEqual(mock_write.call_count, 4)
+        self.assertFalse(self.writer._tx)
+        loop.remove_writer.assert_called_once_with(42)
+
+    def test_async_drain_flushes_every_queued_item(self):
+        """Test that one writable event after a partial write sends all queued commands and the frame"""
+        loop = MagicMock()
+        self.writer.attach(loop, 42)
+        out = []
+
+        def write(fd, data):
+            n = 2 if not out else len(data)
+            out.append(bytes(data[:n]))
+            return n
+
+        with patch('udp_to_serial.os.write', side_effect=write):
+            self.writer.send(b"V00000\n")
+            self.writer.send(b"L05000I2000\n")
+            self.writer.send(b"V00000\n")
+            self.writer.submit(b"R1200\n")
+            self.writer._on_writable()
+        self.assertEqual(out, [b"V0", b"0000\n", b"L05000I2000\n", b"V00000\n", b"R1200\n"])
+        self.assertEqual(self.writer.frames_written, 1)
+        self.assertIsNone(self.writer._take())
+        self.assertEqual(self.writer.out_waiting, 0)
+
+
+class TestRelayLogging(unittest.TestCase):
+    def test_position_logs_are_sampled(self):
+        relay = UdpToSerialRelay("127.0.0.1", 0, "COM1", 115200, dummy=True, verbose=True, position_log_interval=60)
+        with patch('udp_to_serial.logger') as mock_logger:
+            for k in range(5):
+                relay._emit_frame(b"L0%04d\n" % k)
+            relay._next_position_log = 0.0
+            relay._emit_frame(b"L09999\n")
+        calls = mock_logger.info.call_args_list
+        self.assertEqual(len(calls), 2)
+        # Lazy %-style arguments, tagged as position records
+        self.assertEqual(calls[0][0], ("-> %s", "L00000"))
+        self.assertEqual(calls[1][0], ("-> %s (+%d not logged)", "L09999", 4))
+        self.assertEqual(calls[1][1]["extra"], {"position": True})
+
+    def test_hidden_positions_are_dropped_before_formatting(self):
+        handler = TextHandler(MagicMock(), hide_pos=True)
+        handler.format = MagicMock(return_value="formatted")
+        position = relay_logger.makeRecord("t", logging.INFO, "f", 1, "-> %s", ("L05000",), None,
+                                           extra={"position": True})
+        other = relay_logger.makeRecord("t", logging.INFO, "f", 1, "Device L0 -> ok", (), None)
+        handler.emit(position)
+        handler.emit(other)
+        handler.format.assert_called_once_with(other)
+        self.assertEqual(list(handler.log_queue), ["formatted"])
+
+    def make_pane(self, **kwargs):
+        widget = MagicMock()
+        widget.yview.return_value = (0.0, 1.0)
+        handler = TextHandler(widget, **kwargs)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        widget.reset_mock()
+        return handler, widget
+
+    def log(self, handler, count, start=0):
+        for k in range(start, start + count):
+            handler.emit(relay_logger.makeRecord("t", logging.INFO, "f", 1, "line %d", (k,), None))
+
+    def test_log_pane_ring_is_bounded(self):
+        handler, widget = self.make_pane(max_lines=10, max_insert=100)
+        self.log(handler, 25)
+        self.assertEqual(len(handler.log_queue), 10)
+        handler._schedule_flush()
+        inserted = widget.insert.call_args[0][1]
+        # The oldest 15 lines made way; a marker says so.
+        self.assertEqual(inserted.splitlines(), ["... 15 log lines dropped ..."] + [f"line {k}" for k in range(15, 25)])
+        widget.delete.assert_called_once_with('1.0', '2.0')
+        widget.see.assert_called_once()
+
+    def test_log_pane_inserts_are_capped_and_trimmed(self):
+        handler, widget = self.make_pane(max_lines=5, max_insert=3)
+        self.log(handler, 4)
+        handler._schedule_flush()
+        self.assertEqual(widget.insert.call_args[0][1], "line 0\nline 1\nline 2\n")
+        widget.delete.assert_not_called()
+        handler._schedule_flush()
+        self.log(handler, 4, start=4)
+        handler._schedule_flush()
+        # 7 lines shown, trimmed back to 5
+        widget.delete.assert_called_once_with('1.0', '3.0')
+        self.assertEqual(handler._lines, 5)
+        self.assertEqual(len(handler.log_queue), 1)
+
+    def test_log_pane_pause_and_scroll_lock(self):
+        handler, widget = self.make_pane()
+        handler.paused = True
+        self.log(handler, 3)
+        handler._schedule_flush()
+        widget.insert.assert_not_called()
+        widget.after.assert_called_once()
+        handler.paused = False
+        # Scrolled up: new lines are added but the view stays put.
+        widget.yview.return_value = (0.2, 0.5)
+        handler._schedule_flush()
+        widget.insert.assert_called_once()
+        widget.see.assert_not_called()
+
+    def test_listener_handles_records_off_thread(self):
+        seen = []
+
+        class Recorder(logging.Handler):
+            def emit(self, record):
+                seen.append((self.format(record), threading.get_ident()))
+
+        before = list(relay_logger.handlers)
+        listener = start_log_listener(Recorder())
+        try:
+            relay_logger.info("-> %s", "L01234", extra={"position": True})
+        finally:
+            stop_log_listener(listener)
+        self.assertEqual(relay_logger.handlers, before)
+        self.assertEqual(len(seen), 1)
+        self.assertEqual(seen[0][0], "-> L01234")
+        self.assertNotEqual(seen[0][1], threading.get_ident())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import sys
+import os
+import math
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from waveform_engine import MOTION_MODES, TABLE_SIZE, WaveformEngine, build_mode_tables
+
+
+class FakeClock:
+    """perf_counter stand-in that only moves when the engine sleeps (or a test stalls it)."""
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestModeTables(unittest.TestCase):
+    def test_walk_matches_sine_formula(self):
+        frames_a, frames_b = build_mode_tables("walk", stroke=50, base_squeeze=50, phase_shift=180)
+        self.assertEqual(len(frames_a), TABLE_SIZE)
+        center = 0.5 * 9999
+        self.assertEqual(frames_a[0], b"L0%04d I20\n" % int(center))
+        self.assertEqual(frames_a[TABLE_SIZE // 4], b"L0%04d I20\n" % int(center + 2500))
+        # 180 degrees apart: B at phase 0 is A half a cycle later.
+        self.assertEqual(frames_b[0], frames_a[TABLE_SIZE // 2])
+
+    def test_every_mode_stays_in_range(self):
+        for mode in MOTION_MODES:
+            frames_a, frames_b = build_mode_tables(mode, stroke=100, pitch_amp=100, roll_amp=100,
+                                                   twist_amp=100, size=64)
+            for frame in frames_a + frames_b:
+                self.assertTrue(frame.endswith(b" I20\n"), frame)
+                for token in frame.split()[:-1]:
+                    self.assertEqual(len(token), 6, (mode, frame))
+
+    def test_synced_axes_match_between_devices(self):
+        frames_a, frames_b = build_mode_tables("squeeze_rub", size=64)
+        for a, b in zip(frames_a, frames_b):
+            self.assertEqual(a.split()[0], b.split()[0])
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            build_mode_tables("jog")
+
+
+class TestWaveformEngine(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sent_a = []
+        self.sent_b = []
+
+    def engine(self, **kwargs):
+        engine = WaveformEngine(self.sent_a.append, self.sent_b.append, clock=self.clock,
+                                sleep=self.clock.sleep, **kwargs)
+        return engine
+
+    def test_ticks_map_to_phase(self):
+        engine = self.engine(rate_hz=50, speed=1.0)
+        frames_a, _ = engine.tables
+        self.assertEqual(engine.frames_at(0)[0], frames_a[0])
+        self.assertEqual(engine.frames_at(25)[0], frames_a[TABLE_SIZE // 2])
+        self.assertEqual(engine.frames_at(50)[0], frames_a[0])
+
+    def test_speed_change_keeps_phase(self):
+        engine = self.engine(rate_hz=50, speed=1.0)
+        engine.tick = 25
+        before = engine.frames_at(25)
+        tables = engine.tables
+        engine.configure(speed=2.0)
+        self.assertEqual(engine.frames_at(25), before)
+        # Speed does not change the shape, so the tables are kept.
+        self.assertIs(engine.tables, tables)
+        engine.configure(speed=1.0, stroke=20.0)
+        self.assertIsNot(engine.tables, tables)
+
+    def test_absolute_deadlines_do_not_drift(self):
+        engine = self.engine(rate_hz=50)
+        start = self.clock.now
+
+        def send(frame):
+            self.sent_a.append(frame)
+            # Every send costs 1 ms; relative sleeps would add it up.
+            self.clock.now += 0.001
+            if len(self.sent_a) == 500:
+                engine.running = False
+
+        engine.send_a = send
+        engine.run()
+        self.assertEqual(len(self.sent_b), 500)
+        self.assertAlmostEqual(self.clock.now, start + 499 * 0.02 + 0.001, places=6)
+        self.assertEqual(engine.ticks_skipped, 0)
+
+    def test_stall_skips_ticks_instead_of_bursting(self):
+        engine = self.engine(rate_hz=50)
+
+        def send(frame):
+            self.sent_a.append(frame)
+            if len(self.sent_a) == 2:
+                self.clock.now += 0.105
+            if len(self.sent_a) == 5:
+                engine.running = False
+
+        engine.send_a = send
+        engine.run()
+        self.assertEqual(engine.ticks_skipped, 4)
+        self.assertEqual(engine.tick, 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,8 @@ import unittest
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import asyncio
+import threading
 
 # Use absolute paths to ensure the module under test is importable
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -26,7 +28,25 @@ def setup_mocks():
 
 setup_mocks()
 
-from udp_to_serial import TCodeWSServer
+from udp_to_serial import (TCodeWSServer, BINARY_SUBPROTOCOL, decode_axis_frame, _select_subprotocol,
+                           parse_subscription, ALL_AXES)
+
+
+class FakeWebSocket:
+    """Minimal connection double; `gate` holds every send until it is set."""
+    def __init__(self, gate=None, subprotocol=None):
+        self.subprotocol = subprotocol
+        self.sent = []
+        self.gate = gate
+        self.closed = asyncio.Event()
+
+    async def send(self, message):
+        if self.gate:
+            await self.gate.wait()
+        self.sent.append(message)
+
+    async def wait_closed(self):
+        await self.closed.wait()
 
 class TestTCodeWSServer(unittest.TestCase):
     @patch('udp_to_serial.websockets.serve')
@@ -51,7 +71,8 @@ class TestTCodeWSServer(unittest.TestCase):
 
         # Before fix, this will fail because it's called with "0.0.0.0"
         # and server doesn't even have a host parameter in __init__ yet.
-        mock_ws_serve.assert_called_with(server._handler, "127.0.0.1", 8765)
+        mock_ws_serve.assert_called_with(server._handler, "127.0.0.1", 8765, subprotocols=[BINARY_SUBPROTOCOL],
+                                         select_subprotocol=_select_subprotocol)
 
     @patch('udp_to_serial.websockets.serve')
     @patch('udp_to_serial.asyncio.new_event_loop')
@@ -71,7 +92,143 @@ class TestTCodeWSServer(unittest.TestCase):
             if str(e) != "Stop loop":
                 raise e
 
-        mock_ws_serve.assert_called_with(server._handler, "192.168.1.5", 8888)
+        mock_ws_serve.assert_called_with(server._handler, "192.168.1.5", 8888, subprotocols=[BINARY_SUBPROTOCOL],
+                                         select_subprotocol=_select_subprotocol)
+
+    def test_slow_client_does_not_block_broadcast(self):
+        """Test per-client queues: a stalled client drops its oldest messages only"""
+        async def scenario():
+            server = TCodeWSServer(queue_size=2)
+            server.loop = asyncio.get_running_loop()
+            server._loop_thread_id = threading.get_ident()
+            server.running = True
+            fast, slow = FakeWebSocket(), FakeWebSocket(gate=asyncio.Event())
+            handlers = [asyncio.ensure_future(server._handler(ws)) for ws in (fast, slow)]
+            await asyncio.sleep(0)
+
+            for i in range(5):
+                server.broadcast(f"L0{i}")
+                await asyncio.sleep(0)
+            self.assertEqual(fast.sent, ["L00", "L01", "L02", "L03", "L04"])
+            self.assertEqual(slow.sent, [])
+            self.assertEqual(server.clients[slow].dropped, 2)
+
+            slow.gate.set()
+            await asyncio.sleep(0.01)
+            self.assertEqual(slow.sent, ["L00", "L03", "L04"])
+
+            for ws in (fast, slow):
+                ws.closed.set()
+            await asyncio.gather(*handlers)
+            self.assertEqual(server.clients, {})
+
+        asyncio.run(scenario())
+
+    def test_coalesced_broadcast_pushes_newest_state_per_tick(self):
+        """Test that coalesced mode merges axis updates and sends one frame per tick"""
+        async def scenario():
+            server = TCodeWSServer(broadcast_rate_hz=60)
+            server.loop = asyncio.get_running_loop()
+            server._loop_thread_id = threading.get_ident()
+            server.running = True
+            ws = FakeWebSocket()
+            handler = asyncio.ensure_future(server._handler(ws))
+            await asyncio.sleep(0)
+
+            # From another thread, like the threaded relay.
+            def produce():
+                server.broadcast("L0100 R1200")
+                server.broadcast("L0300")
+            thread = threading.Thread(target=produce)
+            thread.start()
+            thread.join()
+            await asyncio.sleep(0)
+            self.assertEqual(ws.sent, [])
+
+            server._next_flush = server.loop.time()
+            server._flush()
+            await asyncio.sleep(0)
+            self.assertEqual(ws.sent, ["L0300 R1200"])
+
+            # Non-axis commands are not held back.
+            server.broadcast("D0")
+            await asyncio.sleep(0)
+            self.assertEqual(ws.sent, ["L0300 R1200", "D0"])
+
+            server.running = False
+            server._flush_handle.cancel()
+            ws.closed.set()
+            await handler
+
+        asyncio.run(scenario())
+
+    def test_binary_subprotocol_clients_get_packed_frames(self):
+        """Test that binary clients get packed axis frames while text clients are unchanged"""
+        async def scenario():
+            server = TCodeWSServer()
+            server.loop = asyncio.get_running_loop()
+            server._loop_thread_id = threading.get_ident()
+            server.running = True
+            text, binary = FakeWebSocket(), FakeWebSocket(subprotocol=BINARY_SUBPROTOCOL)
+            handlers = [asyncio.ensure_future(server._handler(ws)) for ws in (text, binary)]
+            await asyncio.sleep(0)
+
+            server.broadcast("L05000I100 R19999")
+            server.broadcast("D0")
+            await asyncio.sleep(0)
+            self.assertEqual(text.sent, ["L05000I100 R19999", "D0"])
+            self.assertEqual(binary.sent[1], "D0")
+            frame = binary.sent[0]
+            self.assertIsInstance(frame, bytes)
+            self.assertEqual(len(frame), 16 + 2 * 2)
+            timestamp_us, positions = decode_axis_frame(frame)
+            self.assertGreater(timestamp_us, 0)
+            self.assertEqual(positions, {"L0": 32767, "R1": 65528})
+
+            for ws in (text, binary):
+                ws.closed.set()
+            await asyncio.gather(*handlers)
+            self.assertEqual(server._binary_clients, 0)
+
+        asyncio.run(scenario())
+
+    def test_parse_subscription(self):
+        self.assertEqual(parse_subscription("/"), (0, 0))
+        self.assertEqual(parse_subscription("/?axes=L0,v0,bogus"), ((1 << 0) | (1 << 20), 0))
+        self.assertEqual(parse_subscription("/?rate=30"), (ALL_AXES, 30.0))
+        self.assertEqual(parse_subscription("/?axes=R1&rate=fast"), (1 << 11, 0))
+
+    def test_axis_subscriptions_and_rate_limit(self):
+        """Test that filtered clients only get their axes, at most at their rate"""
+        async def scenario():
+            server = TCodeWSServer()
+            server.loop = asyncio.get_running_loop()
+            server._loop_thread_id = threading.get_ident()
+            server.running = True
+            everything, l0_only, slow_v0 = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            handlers = [asyncio.ensure_future(server._handler(ws, path))
+                        for ws, path in ((everything, "/"), (l0_only, "/?axes=L0"), (slow_v0, "/?axes=V0&rate=20"))]
+            await asyncio.sleep(0)
+
+            server.broadcast("L0100 R1200")
+            server.broadcast("R1300")
+            server.broadcast("V0100")
+            server.broadcast("V0200 L0400")
+            server.broadcast("D0")
+            await asyncio.sleep(0)
+            self.assertEqual(everything.sent, ["L0100 R1200", "R1300", "V0100", "V0200 L0400", "D0"])
+            self.assertEqual(l0_only.sent, ["L0100", "L0400"])
+            # The second V0 update arrived inside the 50 ms window and is held back.
+            self.assertEqual(slow_v0.sent, ["V0100"])
+            await asyncio.sleep(0.08)
+            self.assertEqual(slow_v0.sent, ["V0100", "V0200"])
+
+            for ws in (everything, l0_only, slow_v0):
+                ws.closed.set()
+            await asyncio.gather(*handlers)
+            self.assertEqual((server._unfiltered, server._filtered, server._route_mask), ((), (), 0))
+
+        asyncio.run(scenario())
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,126 @@
+"""Binary capture and replay of relay UDP traffic.
+
+A capture starts with `CAPTURE_MAGIC` and a version, followed by one record per
+datagram: a little-endian header (uint64 monotonic timestamp in nanoseconds,
+IPv4 address, uint16 port, uint16 payload length) and the raw payload.
+
+Replay a capture against a running relay:
+
+    python udp_capture.py session.tcap --host 127.0.0.1 --port 8000 --speed 2
+    python udp_capture.py session.tcap --fast
+"""
+import argparse
+import mmap
+import socket
+import struct
+import time
+
+CAPTURE_MAGIC = b"TCUDPCAP"
+CAPTURE_VERSION = 1
+_FILE_HEADER = struct.Struct("<8sHH")
+_RECORD = struct.Struct("<Q4sHH")
+
+
+class CaptureWriter:
+    """Writes datagrams to a new capture file through a buffered writer.
+
+    An existing file is replaced: timestamps are only comparable within one
+    relay session, so sessions are never appended to each other.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(_FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, 0))
+        self.records = 0
+        self._addr = None
+        self._packed_ip = b"\0\0\0\0"
+
+    def write(self, timestamp_ns: int, addr, payload):
+        """Records one datagram; `payload` may be a memoryview into the receive ring."""
+        if addr != self._addr:
+            # Senders rarely change, so the address is packed once per sender.
+            self._addr = addr
+            self._packed_ip = socket.inet_aton(addr[0])
+        write = self.file.write
+        write(_RECORD.pack(timestamp_ns, self._packed_ip, addr[1], len(payload)))
+        write(payload)
+        self.records += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def read_capture(path: str):
+    """Yields (timestamp_ns, (ip, port), payload bytes) for every record in a capture.
+
+    The file is memory-mapped, so even long sessions are not read into memory.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) < _FILE_HEADER.size:
+            raise ValueError(f"{path}: not a UDP capture")
+        magic, version, _ = _FILE_HEADER.unpack_from(data)
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(f"{path}: not a UDP capture (version {CAPTURE_VERSION})")
+        pos = _FILE_HEADER.size
+        end = len(data)
+        unpack_from = _RECORD.unpack_from
+        record_size = _RECORD.size
+        while pos + record_size <= end:
+            timestamp_ns, packed_ip, port, length = unpack_from(data, pos)
+            pos += record_size
+            if pos + length > end:
+                # Truncated last record (capture interrupted mid-write)
+                break
+            yield timestamp_ns, (socket.inet_ntoa(packed_ip), port), data[pos:pos + length]
+            pos += length
+
+
+def replay(path: str, target, speed: float = 1.0, sock: socket.socket = None,
+           clock=time.perf_counter, sleep=time.sleep) -> int:
+    """Re-sends a capture to `target` (host, port); returns the number of datagrams sent.
+
+    `speed` scales the recorded timing (2.0 = twice as fast); 0 sends as fast as
+    possible. Send times are absolute deadlines from the start of the replay, so
+    sleep overshoot never accumulates.
+    """
+    own_sock = sock is None
+    if own_sock:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = 0
+    try:
+        start = None
+        first_ns = 0
+        for timestamp_ns, _, payload in read_capture(path):
+            if start is None:
+                start = clock()
+                first_ns = timestamp_ns
+            if speed > 0:
+                delay = start + (timestamp_ns - first_ns) / 1e9 / speed - clock()
+                if delay > 0:
+                    sleep(delay)
+            sock.sendto(payload, target)
+            sent += 1
+    finally:
+        if own_sock:
+            sock.close()
+    return sent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a relay UDP capture.")
+    parser.add_argument("capture", help="capture file written by the relay")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--speed", type=float, default=1.0, help="timing multiplier (2 = twice as fast)")
+    parser.add_argument("--fast", action="store_true", help="send as fast as possible")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    sent = replay(args.capture, (args.host, args.port), speed=0 if args.fast else args.speed)
+    elapsed = time.perf_counter() - started
+    print(f"Replayed {sent} datagrams to {args.host}:{args.port} in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
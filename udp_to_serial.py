@@ -1,14 +1,22 @@
 import socket
+import os
 
 import asyncio
 import websockets
 import time
 import argparse
 import logging
+import logging.handlers
+import queue
 import sys
 import threading
 import select
 import re
+import struct
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+from udp_capture import CaptureWriter
+from relay_metrics import COUNT_BOUNDS, SECONDS_BOUNDS, MetricsServer, PrometheusText, RelayMetrics
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 
@@ -23,34 +31,560 @@ except ImportError:
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
+# `extra` of the sampled `-> frame` logs; handlers drop them on this attribute, unformatted.
+POSITION_LOG = {"position": True}
+
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """Queues records as they are; the listener thread does all of the formatting.
+
+    The stock `prepare` formats the message on the logging thread. Records never
+    leave the process here, and relay log arguments are immutable strings.
+    """
+    def prepare(self, record):
+        return record
+
+
+def start_log_listener(*handlers):
+    """Routes the relay logger through a queue drained by a background `QueueListener`.
+
+    A log call on the relay thread only enqueues the record; filtering,
+    formatting and handler I/O happen on the listener thread. Returns the
+    started listener; pass it to `stop_log_listener` to tear it down.
+    """
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(_RecordQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def stop_log_listener(listener):
+    """Detaches the relay logger from `listener`'s queue, then flushes and stops it."""
+    for handler in logger.handlers[:]:
+        if isinstance(handler, _RecordQueueHandler) and handler.queue is listener.queue:
+            logger.removeHandler(handler)
+    listener.stop()
 
 # T-Code parsing regex
 # ⚡ Optimized: Byte-level regex to avoid string decoding overhead prior to regex evaluation
 TCODE_REGEX_BYTES = re.compile(br'([a-zA-Z][0-9])([0-9]+(?:[ISis][0-9]+)?)')
 
+# Per-axis slots: L0-L9, R0-R9, V0-V9, A0-A9
+AXIS_LETTERS = b"LRVA"
+AXIS_COUNT = 40
+AXIS_NAMES = [bytes((letter, 48 + channel)) for letter in AXIS_LETTERS for channel in range(10)]
+AXIS_SLOTS = {name: slot for slot, name in enumerate(AXIS_NAMES)}
+ALL_AXES = (1 << AXIS_COUNT) - 1
+_AXIS_BASES = tuple((letter, 10 * k) for k, letter in enumerate(AXIS_LETTERS))
+_DIGIT = bytes(48 <= c <= 57 for c in range(256))
+# Uppercases ASCII letters; with b" " as the delete set, one translate pass
+# normalizes a batch instead of a replace() copy followed by an upper() copy.
+_UPPER = bytes.maketrans(b"abcdefghijklmnopqrstuvwxyz", b"ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+# Receive ring: datagrams are read back to back into one preallocated buffer.
+UDP_MAX_DATAGRAM = 4096
+UDP_RING_SIZE = 64 * 1024
+# Above this many bytes the reverse per-axis scan beats sweeping every token.
+REVERSE_SCAN_MIN = 256
+
+
+def _value_end(data, j, n):
+    """Index just past the digits (and optional I/S suffix) starting at `j`."""
+    digit = _DIGIT
+    while j < n and digit[data[j]]:
+        j += 1
+    # 73 = b"I", 83 = b"S"
+    if j + 1 < n and (data[j] == 73 or data[j] == 83) and digit[data[j + 1]]:
+        j += 2
+        while j < n and digit[data[j]]:
+            j += 1
+    return j
+
+
+def _normalize(data) -> bytes:
+    """Uppercased copy of `data` without spaces, as bytes."""
+    if type(data) is not bytes:
+        data = bytes(data)
+    return data.translate(_UPPER, b" ")
+
+
+def tokenize_tcode(data, slots) -> int:
+    """Byte-level T-Code tokenizer writing straight into per-axis slots.
+
+    Accepts bytes, bytearray or memoryview. For every L/R/V/A axis in `data`,
+    the value of its last occurrence (digits plus any I/S suffix) is stored in
+    `slots[slot]`; the return value is a bitmask of the slots written. Token
+    grammar matches `TCODE_REGEX_BYTES` (spaces ignored, case-insensitive).
+
+    Long bursts are scanned backwards with one `rfind` per axis, so every
+    superseded token is skipped in C and the cost stays flat no matter how many
+    packets were merged. Short batches have too few tokens to amortise the 10
+    lookups per axis letter, and one regex sweep is cheaper there.
+    """
+    data = _normalize(data)
+    n = len(data)
+    if n < REVERSE_SCAN_MIN:
+        return _regex_into_slots(data, slots)
+
+    found = 0
+    digit = _DIGIT
+    rfind = data.rfind
+    names = AXIS_NAMES
+    for letter, base in _AXIS_BASES:
+        if letter not in data:
+            continue
+        for slot in range(base, base + 10):
+            name = names[slot]
+            i = rfind(name)
+            # An axis letter can only ever start a token, so the last hit followed by a
+            # digit is exactly the token the regex sweep would have kept.
+            while i >= 0:
+                if i + 2 < n and digit[data[i + 2]]:
+                    slots[slot] = data[i + 2:_value_end(data, i + 3, n)]
+                    found |= 1 << slot
+                    break
+                i = rfind(name, 0, i + 1)
+    return found
+
+
+def _regex_into_slots(data, slots) -> int:
+    found = 0
+    get_slot = AXIS_SLOTS.get
+    for axis, value in TCODE_REGEX_BYTES.findall(data):
+        slot = get_slot(axis)
+        if slot is not None:
+            slots[slot] = value
+            found |= 1 << slot
+    return found
+
+
+def tokenize_tcode_regex(data, slots) -> int:
+    """Regex fallback with the same contract as `tokenize_tcode`, for any batch size."""
+    return _regex_into_slots(_normalize(data), slots)
+
+
+def format_tcode_frame(mask: int, slots) -> bytes:
+    """Builds a newline-terminated frame from the slots set in `mask`, in slot order."""
+    names = AXIS_NAMES
+    parts = []
+    append = parts.append
+    while mask:
+        low = mask & -mask
+        slot = low.bit_length() - 1
+        # ⚡ Optimized: Direct bytes concatenation instead of formatting.
+        append(names[slot] + slots[slot])
+        mask ^= low
+    return b" ".join(parts) + b"\n"
+
+
+# Binary WebSocket subprotocol: little-endian header (uint64 monotonic timestamp in
+# microseconds, uint64 axis bitmask in `AXIS_NAMES` order) followed by one uint16
+# position (0-65535) per set bit, lowest bit first.
+BINARY_SUBPROTOCOL = "tcode-bin.v1"
+_BINARY_HEADER = struct.Struct("<QQ")
+
+
+def _select_subprotocol(first, second):
+    """Picks the binary subprotocol when offered; plain clients connect without one.
+
+    websockets >= 14 calls this as (connection, offered), the legacy API as
+    (offered, available); the default selection would reject clients offering none.
+    """
+    offered = first if isinstance(first, (list, tuple)) else second
+    return BINARY_SUBPROTOCOL if BINARY_SUBPROTOCOL in offered else None
+
+
+def tcode_position(value: bytes) -> int:
+    """Scales a T-Code value (fractional digits, optional I/S suffix) to uint16."""
+    digits = value
+    for i, c in enumerate(value):
+        if not 48 <= c <= 57:
+            digits = value[:i]
+            break
+    return int(digits) * 65535 // 10 ** len(digits)
+
+
+def encode_axis_frame(mask: int, slots, timestamp_us: int = None) -> bytes:
+    if timestamp_us is None:
+        timestamp_us = time.monotonic_ns() // 1000
+    positions = []
+    pending = mask
+    while pending:
+        low = pending & -pending
+        positions.append(tcode_position(slots[low.bit_length() - 1]))
+        pending ^= low
+    return _BINARY_HEADER.pack(timestamp_us, mask) + struct.pack(f"<{len(positions)}H", *positions)
+
+
+def decode_axis_frame(data: bytes):
+    """Client-side helper: returns (timestamp_us, {axis name: uint16 position})."""
+    timestamp_us, mask = _BINARY_HEADER.unpack_from(data)
+    positions = struct.unpack_from(f"<{(len(data) - _BINARY_HEADER.size) // 2}H", data, _BINARY_HEADER.size)
+    names = [AXIS_NAMES[slot].decode() for slot in range(AXIS_COUNT) if mask >> slot & 1]
+    return timestamp_us, dict(zip(names, positions))
+
+
+def _split_suffix(value: bytes):
+    """Splits a T-Code value into (position digits, b"I"/b"S"/b"", suffix number or None)."""
+    for i, c in enumerate(value):
+        if not 48 <= c <= 57:
+            return value[:i], value[i:i + 1], int(value[i + 1:])
+    return value, b"", None
+
+
+class IntervalMerger:
+    """Merges the I/S parameters of superseded commands instead of dropping them.
+
+    Last-wins merging keeps only the final token per axis, and with it only the
+    final interval. For the axes given a policy, every token's suffix is
+    accumulated between emits and the merged frame is rewritten from them:
+
+    * `last` - the final token as sent (the default for axes without a policy).
+    * `average` - the mean interval (or speed) of the merged commands.
+    * `velocity` - the combined travel time of the merged moves, so a burst
+      plays out at the speed it was sent at instead of in one interval.
+      `S` is already a speed and keeps its final value.
+    """
+    POLICIES = ("last", "average", "velocity")
+
+    def __init__(self, policies: dict):
+        self.mask = 0
+        self.velocity = 0
+        for slot, policy in policies.items():
+            if policy not in self.POLICIES:
+                raise ValueError(f"Unknown merge policy: {policy!r}")
+            if policy != "last":
+                self.mask |= 1 << slot
+            if policy == "velocity":
+                self.velocity |= 1 << slot
+        self.totals = [0] * AXIS_COUNT
+        self.counts = [0] * AXIS_COUNT
+        self.speed_totals = [0] * AXIS_COUNT
+        self.speed_counts = [0] * AXIS_COUNT
+
+    def tokenize(self, data, slots) -> int:
+        """Tokenizer with the contract of `tokenize_tcode` that also accumulates suffixes.
+
+        Every token has to be seen (not just the last per axis), so this is one
+        regex sweep that fills `slots` and counts the I/S suffixes of the axes
+        with a policy in the same pass.
+        """
+        mask = self.mask
+        get_slot = AXIS_SLOTS.get
+        found = 0
+        for axis, value in TCODE_REGEX_BYTES.findall(_normalize(data)):
+            slot = get_slot(axis)
+            if slot is None:
+                continue
+            slots[slot] = value
+            found |= 1 << slot
+            if not mask >> slot & 1 or value.isdigit():
+                continue
+            _, kind, number = _split_suffix(value)
+            if kind == b"I":
+                self.totals[slot] += number
+                self.counts[slot] += 1
+            else:
+                self.speed_totals[slot] += number
+                self.speed_counts[slot] += 1
+        return found
+
+    def take(self, other, mask: int, won: int):
+        """Moves the suffixes `other` (a source's merger) accumulated for the slots in `mask`.
+
+        Only the slots in `won` (accepted by arbitration) are added here; the
+        rest are discarded, so a source that lost an axis never skews its timing.
+        """
+        mask &= self.mask
+        while mask:
+            low = mask & -mask
+            slot = low.bit_length() - 1
+            mask ^= low
+            if won & low:
+                self.totals[slot] += other.totals[slot]
+                self.counts[slot] += other.counts[slot]
+                self.speed_totals[slot] += other.speed_totals[slot]
+                self.speed_counts[slot] += other.speed_counts[slot]
+            other.totals[slot] = other.counts[slot] = 0
+            other.speed_totals[slot] = other.speed_counts[slot] = 0
+
+    def apply(self, mask: int, values):
+        """Rewrites the suffixes of the slots in `mask` (about to be emitted) and resets them."""
+        mask &= self.mask
+        while mask:
+            low = mask & -mask
+            slot = low.bit_length() - 1
+            mask ^= low
+            count = self.counts[slot]
+            speed_count = self.speed_counts[slot]
+            # A single command (or none with a suffix) has nothing to merge.
+            if count > 1:
+                total = self.totals[slot]
+                interval = total if self.velocity & low else (total + count // 2) // count
+                values[slot] = _split_suffix(values[slot])[0] + b"I" + str(interval).encode()
+            elif speed_count > 1 and not self.velocity & low:
+                speed = (self.speed_totals[slot] + speed_count // 2) // speed_count
+                values[slot] = _split_suffix(values[slot])[0] + b"S" + str(speed).encode()
+            self.totals[slot] = self.counts[slot] = 0
+            self.speed_totals[slot] = self.speed_counts[slot] = 0
+
+
+def parse_merge_policies(spec: str) -> dict:
+    """Parses `L0=velocity, R0=average` (or `*=velocity`) into {slot: policy}."""
+    policies = {}
+    for entry in spec.split(","):
+        entry = "".join(entry.split())
+        if not entry:
+            continue
+        axis, sep, policy = entry.partition("=")
+        policy = policy.lower()
+        if not sep or policy not in IntervalMerger.POLICIES:
+            raise ValueError(f"Invalid merge policy: {entry!r}")
+        if axis == "*":
+            policies.update(dict.fromkeys(range(AXIS_COUNT), policy))
+            continue
+        slot = AXIS_SLOTS.get(axis.upper().encode())
+        if slot is None:
+            raise ValueError(f"Invalid merge policy: {entry!r}")
+        policies[slot] = policy
+    return policies
+
+
+class AxisTable:
+    """Persistent per-axis state for L0-L9, R0-R9, V0-V9 and A0-A9.
+
+    `values` holds the latest value per slot and `sent` the value last handed
+    to the device; both are preallocated and indexed like `AXIS_NAMES`.
+    `dirty` is a bitmask of slots updated since the last `emit`. With `delta`
+    only axes whose value actually changed are emitted, and every
+    `refresh_interval` seconds (0 = never) a full frame resends all known axes,
+    but only while input is live (something arrived since the last refresh)
+    and `refresh_enabled` is set; the relay clears it on signal loss so a
+    refresh never undoes the watchdog. An optional `merger` (`IntervalMerger`)
+    tokenizes every update and rewrites the I/S suffixes of emitted axes.
+    """
+    def __init__(self, delta: bool = False, refresh_interval: float = 0, merger: IntervalMerger = None):
+        self.values = [None] * AXIS_COUNT
+        self.sent = [None] * AXIS_COUNT
+        self.dirty = 0
+        self.known = 0
+        # Mask of the slots in the last frame returned by `emit`.
+        self.emitted = 0
+        self.delta = delta
+        self.refresh_interval = refresh_interval
+        self.refresh_enabled = True
+        self._next_refresh = 0.0
+        # Slots updated since the last refresh
+        self._live = 0
+        self.merger = merger
+
+    def update(self, data, tokenize=tokenize_tcode) -> int:
+        """Tokenizes `data` straight into the table; returns the mask of axes it carried."""
+        if self.merger:
+            found = self.merger.tokenize(data, self.values)
+        else:
+            found = tokenize(data, self.values)
+        self.dirty |= found
+        self.known |= found
+        return found
+
+    def emit(self):
+        """Returns the frame for the dirty axes (bytes, newline-terminated) or None."""
+        mask = self.dirty
+        self.dirty = 0
+        self.emitted = 0
+        delta = self.delta
+        if self.refresh_interval:
+            self._live |= mask
+            now = time.monotonic()
+            if now >= self._next_refresh:
+                self._next_refresh = now + self.refresh_interval
+                if self._live and self.refresh_enabled:
+                    mask = self.known
+                    delta = False
+                self._live = 0
+        if not mask:
+            return None
+        values = self.values
+        if self.merger:
+            self.merger.apply(mask, values)
+        sent = self.sent
+        pending = mask
+        while pending:
+            low = pending & -pending
+            slot = low.bit_length() - 1
+            value = values[slot]
+            if delta and value == sent[slot]:
+                mask ^= low
+            else:
+                sent[slot] = value
+            pending ^= low
+        if not mask:
+            return None
+        self.emitted = mask
+        return format_tcode_frame(mask, values)
+
+
+def parse_subscription(path: str):
+    """Reads `?axes=L0,V0&rate=30` from a connect URL into (axis mask, max rate in Hz).
+
+    A client that asks for neither gets every message unfiltered (mask 0). A
+    rate without axes subscribes to all axes; axis-only clients do not receive
+    non-axis messages such as feedback echoes.
+    """
+    query = parse_qs(urlsplit(path or '').query)
+    mask = 0
+    for name in ",".join(query.get('axes', [])).split(","):
+        slot = AXIS_SLOTS.get(name.strip().upper().encode())
+        if slot is not None:
+            mask |= 1 << slot
+    try:
+        max_rate = float(query.get('rate', ['0'])[0])
+    except ValueError:
+        max_rate = 0.0
+    if max_rate > 0 and not mask:
+        mask = ALL_AXES
+    return mask, max_rate
+
+
+class WSClient:
+    """Outbound state of one WebSocket client: a bounded drop-oldest queue.
+
+    Owned by the server loop; `push` never awaits, so a slow client only ever
+    loses its own oldest messages (counted in `dropped`) instead of holding up
+    the broadcast to everyone else.
+    """
+    __slots__ = ("websocket", "queue", "wakeup", "dropped", "binary",
+                 "mask", "min_interval", "next_due", "pending", "flush_handle")
+
+    def __init__(self, websocket, queue_size: int, mask: int = 0, max_rate: float = 0):
+        self.websocket = websocket
+        # Negotiated the binary subprotocol: axis updates go out as packed frames.
+        self.binary = getattr(websocket, 'subprotocol', None) == BINARY_SUBPROTOCOL
+        self.queue = deque(maxlen=queue_size)
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        # Subscription (see `parse_subscription`): 0 = every message, unfiltered.
+        self.mask = mask
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.next_due = 0.0
+        self.pending = AxisTable() if mask else None
+        self.flush_handle = None
+
+    def offer(self, mask: int, slots, loop):
+        """Merges subscribed axis values; sends now or once the rate limit allows."""
+        pending = self.pending
+        values = pending.values
+        bits = mask
+        while bits:
+            low = bits & -bits
+            slot = low.bit_length() - 1
+            values[slot] = slots[slot]
+            bits ^= low
+        pending.dirty |= mask
+        pending.known |= mask
+        now = loop.time()
+        if now >= self.next_due:
+            self.flush(now)
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_at(self.next_due, self._flush_due, loop)
+
+    def _flush_due(self, loop):
+        self.flush_handle = None
+        self.flush(loop.time())
+
+    def flush(self, now: float):
+        pending = self.pending
+        frame = pending.emit()
+        if frame:
+            self.push(encode_axis_frame(pending.emitted, pending.values) if self.binary
+                      else frame[:-1].decode('ascii'))
+            self.next_due = now + self.min_interval
+
+    def push(self, message):
+        queue = self.queue
+        if len(queue) == queue.maxlen:
+            # deque(maxlen) discards the oldest entry on append.
+            self.dropped += 1
+        queue.append(message)
+        self.wakeup.set()
+
+    async def send_loop(self):
+        queue = self.queue
+        wakeup = self.wakeup
+        send = self.websocket.send
+        try:
+            while True:
+                while queue:
+                    await send(queue.popleft())
+                wakeup.clear()
+                await wakeup.wait()
+        except Exception:
+            # Connection closed mid-send; the handler cleans up once wait_closed() returns.
+            return
+
 
 class TCodeWSServer:
-    def __init__(self, port=8765, host="127.0.0.1"):
+    def __init__(self, port=8765, host="127.0.0.1", queue_size: int = 32, broadcast_rate_hz: float = 0):
         self.port = port
         self.host = host
-        self.clients = set()
+        # websocket -> WSClient; only touched from the server loop.
+        self.clients = {}
+        self.queue_size = queue_size
         self.loop = None
         self.running = False
         self.thread = None
+        self._loop_thread_id = None
+        # Coalesced mode: axis updates are merged here and pushed at broadcast_rate_hz.
+        self.broadcast_rate_hz = broadcast_rate_hz
+        self._coalesced = AxisTable() if broadcast_rate_hz > 0 else None
+        self._coalesce_lock = threading.Lock()
+        self._flush_handle = None
+        self._binary_clients = 0
+        # Routing table, rebuilt on connect/disconnect: unfiltered clients, filtered
+        # clients, and the union of the filtered masks to skip them all at once.
+        self._unfiltered = ()
+        self._filtered = ()
+        self._route_mask = 0
 
     async def _handler(self, websocket, path=None):
-        self.clients.add(websocket)
+        if path is None:
+            # websockets >= 14 no longer passes the path to the handler.
+            path = getattr(getattr(websocket, 'request', None), 'path', None)
+        mask, max_rate = parse_subscription(path)
+        client = WSClient(websocket, self.queue_size, mask, max_rate)
+        self.clients[websocket] = client
+        self._binary_clients += client.binary
+        self._rebuild_routes()
+        sender = asyncio.ensure_future(client.send_loop())
         try:
             await websocket.wait_closed()
         finally:
-            self.clients.remove(websocket)
+            del self.clients[websocket]
+            self._binary_clients -= client.binary
+            self._rebuild_routes()
+            if client.flush_handle:
+                client.flush_handle.cancel()
+            sender.cancel()
+
+    def _rebuild_routes(self):
+        clients = self.clients.values()
+        self._unfiltered = tuple(c for c in clients if not c.mask)
+        self._filtered = tuple(c for c in clients if c.mask)
+        route_mask = 0
+        for client in self._filtered:
+            route_mask |= client.mask
+        self._route_mask = route_mask
 
     def _start_server(self):
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
+        self._loop_thread_id = threading.get_ident()
 
-        start_server = websockets.serve(self._handler, self.host, self.port)
+        start_server = websockets.serve(self._handler, self.host, self.port,
+                                        subprotocols=[BINARY_SUBPROTOCOL], select_subprotocol=_select_subprotocol)
         self.server = self.loop.run_until_complete(start_server)
+        self._start_flush_timer()
 
         logger.info(f"WebSocket server started on {self.host}:{self.port}")
         self.loop.run_forever()
@@ -61,29 +595,647 @@ class TCodeWSServer:
             self.thread = threading.Thread(target=self._start_server, daemon=True)
             self.thread.start()
 
+    async def start_on_loop(self):
+        """Starts the server on the running event loop instead of a dedicated thread.
+        Used by the asyncio relay engine so UDP, serial and WS share one loop.
+        """
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self.server = await websockets.serve(self._handler, self.host, self.port,
+                                             subprotocols=[BINARY_SUBPROTOCOL], select_subprotocol=_select_subprotocol)
+        self.running = True
+        self._start_flush_timer()
+        logger.info(f"WebSocket server started on {self.host}:{self.port} (shared loop)")
+
+    async def close_on_loop(self):
+        """Counterpart of `start_on_loop`, awaited from the owning loop."""
+        if self.running:
+            self.running = False
+            if self._flush_handle:
+                self._flush_handle.cancel()
+            self.server.close()
+            await self.server.wait_closed()
+            logger.info("WebSocket server stopped")
+
     def stop(self):
         if self.running and self.loop:
             self.running = False
             self.loop.call_soon_threadsafe(self.server.close)
-            self.loop.call_soon_threadsafe(self.loop.stop)
+            # Only stop the loop if we own it; a shared loop belongs to the relay.
+            if self.thread:
+                self.loop.call_soon_threadsafe(self.loop.stop)
             logger.info("WebSocket server stopped")
 
-    async def _broadcast_coro(self, message):
+    def _enqueue(self, message, mask=None, slots=None):
+        # Runs on the server loop without awaiting, so the routing table cannot change under us.
+        if mask is None and (self._binary_clients or self._filtered):
+            slots = [None] * AXIS_COUNT
+            mask = tokenize_tcode(message.encode('ascii', errors='replace'), slots)
+        binary = message
+        if self._binary_clients and mask:
+            # Messages without axes (D0, $B, ...) reach binary clients as text.
+            binary = encode_axis_frame(mask, slots)
+        for client in self._unfiltered:
+            client.push(binary if client.binary else message)
+        # ⚡ One AND skips every filtered client when none of them wants these axes.
+        if mask and mask & self._route_mask:
+            loop = self.loop
+            for client in self._filtered:
+                wanted = mask & client.mask
+                if wanted:
+                    client.offer(wanted, slots, loop)
+
+    def _start_flush_timer(self):
+        if self._coalesced:
+            self._next_flush = self.loop.time()
+            self._flush()
+
+    def _flush(self):
+        """Pushes the newest coalesced axis state, then re-arms on an absolute deadline."""
+        if not self.running:
+            return
         if self.clients:
-            await asyncio.gather(*[client.send(message) for client in self.clients], return_exceptions=True)
+            with self._coalesce_lock:
+                frame = self._coalesced.emit()
+                # Snapshot: producers keep writing the table once the lock is released.
+                slots = list(self._coalesced.values)
+            if frame:
+                self._enqueue(frame[:-1].decode('ascii'), self._coalesced.emitted, slots)
+        period = 1.0 / self.broadcast_rate_hz
+        self._next_flush += period
+        now = self.loop.time()
+        if self._next_flush < now:
+            # Fell behind: resync instead of flushing back to back.
+            self._next_flush = now + period
+        self._flush_handle = self.loop.call_at(self._next_flush, self._flush)
 
     def broadcast(self, message):
         """Broadcasts message to all connected clients.
-        ⚡ Optimized: Extracted inner async function to a class method
-        to prevent redundant object creation overhead per broadcast.
+        ⚡ Optimized: Hands the message to each client's queue instead of creating
+        a coroutine per client, so allocation per broadcast is O(1).
+        With `broadcast_rate_hz` axis updates are only merged here (no thread hop);
+        `_flush` pushes them at the configured frame rate.
         """
         if not self.running or not self.clients or not self.loop:
             return
 
-        asyncio.run_coroutine_threadsafe(self._broadcast_coro(message), self.loop)
+        if self._coalesced:
+            with self._coalesce_lock:
+                found = self._coalesced.update(message.encode('ascii', errors='replace'))
+            if found:
+                return
+            # Not an axis update (e.g. D0, $B): forward it as is.
+
+        if self._loop_thread_id == threading.get_ident():
+            # ⚡ Same-loop caller (asyncio engine): enqueue directly, no cross-thread hop.
+            self._enqueue(message)
+        else:
+            self.loop.call_soon_threadsafe(self._enqueue, message)
+
+    def client_stats(self):
+        """(remote address, queued messages, dropped messages) per client."""
+        return [(getattr(ws, 'remote_address', None), len(c.queue), c.dropped)
+                for ws, c in list(self.clients.items())]
+
+class OutputScheduler:
+    """Paces merged frames to a fixed tick rate, capped by the serial byte budget.
+
+    Deadlines come from `time.monotonic()` (the asyncio loop clock) so ticks stay
+    evenly spaced; a frame also pushes the next tick out until the UART has had
+    time to shift it out at `baud_rate`, so the OS serial buffer never grows.
+    """
+    def __init__(self, rate_hz: float, baud_rate: int, bits_per_byte: int = 10):
+        self.period = 1.0 / rate_hz
+        # 8N1 framing: one start bit, eight data bits, one stop bit per byte.
+        self.byte_time = bits_per_byte / baud_rate if baud_rate else 0.0
+        self.next_tick = 0.0
+
+    def start(self, now: float):
+        self.next_tick = now + self.period
+
+    def max_rate(self, frame_bytes: int) -> float:
+        """Highest tick rate the link can carry for frames of `frame_bytes`."""
+        if not self.byte_time or not frame_bytes:
+            return float('inf')
+        return 1.0 / (frame_bytes * self.byte_time)
+
+    def timeout(self, now: float) -> float:
+        return max(0.0, self.next_tick - now)
+
+    def advance(self, now: float, frame_bytes: int = 0):
+        """Moves to the next tick after one has been served."""
+        next_tick = self.next_tick + self.period
+        if next_tick <= now:
+            # Fell behind (stall, GC pause): resync instead of bursting to catch up.
+            next_tick = now + self.period
+        # Never tick again before the previous frame has left the wire.
+        drained = now + frame_bytes * self.byte_time
+        self.next_tick = next_tick if next_tick > drained else drained
+
+
+class AxisInterpolator:
+    """Upsamples sparse axis targets to the output tick rate.
+
+    Each target is stamped with its (monotonic) arrival time and reached one
+    sender interval later, so output lags the sender by one update. A segment
+    starts at the position the output had reached when the target arrived, so
+    early or late packets never make the output jump. `linear` moves along a
+    straight line; `cubic` follows a Catmull-Rom (Hermite) spline whose entry
+    tangent comes from the last `history` knots (bounded look-behind).
+    Rendered frames come from `out`, an `AxisTable`.
+    """
+    MODES = ("linear", "cubic")
+
+    def __init__(self, mode: str = "linear", history: int = 4, max_interval: float = 0.25,
+                 delta: bool = False, refresh_interval: float = 0):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown interpolation mode: {mode!r}")
+        self.cubic = mode == "cubic"
+        # Longest time a move may take, so a target after a pause is not crept towards.
+        self.max_interval = max_interval
+        self.out = AxisTable(delta=delta, refresh_interval=refresh_interval)
+        # Per slot: (time, position 0-1) knots, newest last; the last one may lie in the future.
+        self.knots = [deque(maxlen=max(history, 2)) for _ in range(AXIS_COUNT)]
+        self.arrived = [0.0] * AXIS_COUNT
+        self.scale = [10000] * AXIS_COUNT
+        # Mask of slots still moving towards their last knot.
+        self.active = 0
+
+    def add(self, mask: int, values, now: float):
+        """Stamps the targets in `mask` (T-Code values from `values`) with arrival time `now`."""
+        out = self.out
+        while mask:
+            low = mask & -mask
+            slot = low.bit_length() - 1
+            mask ^= low
+            # Digits only: the relay does the timing, so I/S suffixes are dropped.
+            value = values[slot]
+            digits = len(value)
+            for i, c in enumerate(value):
+                if not 48 <= c <= 57:
+                    digits = i
+                    break
+            scale = 10 ** digits
+            target = int(value[:digits]) / scale
+            self.scale[slot] = scale
+            knots = self.knots[slot]
+            if not knots:
+                knots.append((now, target))
+                out.values[slot] = value[:digits]
+                out.dirty |= low
+                out.known |= low
+                self.arrived[slot] = now
+                continue
+            interval = min(now - self.arrived[slot], self.max_interval)
+            self.arrived[slot] = now
+            start = (now, self._sample(knots, now))
+            if knots[-1][0] > now:
+                knots[-1] = start
+            else:
+                knots.append(start)
+            knots.append((now + interval, target))
+            self.active |= low
+
+    def reset(self, mask: int, position: float, now: float):
+        """Re-seats the axes in `mask` at `position` (0-1), e.g. after the watchdog moved them.
+
+        The next target then moves from there instead of from the stale knots.
+        """
+        while mask:
+            low = mask & -mask
+            slot = low.bit_length() - 1
+            mask ^= low
+            knots = self.knots[slot]
+            knots.clear()
+            knots.append((now, position))
+            self.arrived[slot] = now
+            self.active &= ~low
+
+    def _sample(self, knots, now: float) -> float:
+        end_time, end = knots[-1]
+        if len(knots) < 2 or now >= end_time:
+            return end
+        start_time, start = knots[-2]
+        span = end_time - start_time
+        u = (now - start_time) / span
+        if not self.cubic:
+            return start + (end - start) * u
+        # Hermite basis; the exit tangent continues the chord (no look-ahead exists).
+        chord = end - start
+        m0 = chord
+        if len(knots) > 2:
+            prev_time, prev = knots[-3]
+            if end_time > prev_time:
+                m0 = (end - prev) * span / (end_time - prev_time)
+        u2 = u * u
+        u3 = u2 * u
+        return ((2 * u3 - 3 * u2 + 1) * start + (u3 - 2 * u2 + u) * m0
+                + (3 * u2 - 2 * u3) * end + (u3 - u2) * chord)
+
+    def emit(self, now: float):
+        """Renders every moving axis at `now`; returns the frame (bytes) or None."""
+        active = self.active
+        out = self.out
+        values = out.values
+        while active:
+            low = active & -active
+            slot = low.bit_length() - 1
+            active ^= low
+            knots = self.knots[slot]
+            if now >= knots[-1][0]:
+                self.active ^= low
+            scale = self.scale[slot]
+            position = int(self._sample(knots, now) * scale + 0.5)
+            position = min(max(position, 0), scale - 1)
+            values[slot] = str(position).zfill(len(str(scale)) - 1).encode()
+            out.dirty |= low
+            out.known |= low
+        return out.emit()
+
+
+class JitterBuffer:
+    """Plays received datagrams out at a steady pace after a playout delay.
+
+    Each datagram is stamped (monotonic) on arrival and scheduled at
+    `max(arrival + delay, previous playout + period)`, where `period` is the
+    smoothed inter-arrival time, so a clump that arrived at once is spread back
+    out. `jitter` is the running mean deviation of the inter-arrival time
+    (RFC 3550 style, gain 1/16). With `adaptive` the delay follows it
+    (`jitter_factor` x jitter, clamped to [min_delay, max_delay]); otherwise it
+    stays at `delay`. No datagram waits longer than `max_delay`, and beyond
+    `max_depth` queued datagrams the oldest is played out at once.
+    """
+    def __init__(self, delay: float = 0.05, adaptive: bool = False, min_delay: float = 0.005,
+                 max_delay: float = 0.2, max_depth: int = 64, jitter_factor: float = 3.0):
+        self.delay = delay
+        self.adaptive = adaptive
+        self.min_delay = min_delay
+        self.max_delay = max(max_delay, delay)
+        self.max_depth = max_depth
+        self.jitter_factor = jitter_factor
+        self.queue = deque()
+        self.period = 0.0
+        self.jitter = 0.0
+        self._last_arrival = None
+        self._last_play = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self.queue)
+
+    def push(self, payload: bytes, source, now: float):
+        last = self._last_arrival
+        self._last_arrival = now
+        if last is not None:
+            gap = now - last
+            if self.period:
+                self.jitter += (abs(gap - self.period) - self.jitter) / 16
+                self.period += (gap - self.period) / 16
+            else:
+                self.period = gap
+        if self.adaptive:
+            self.delay = min(max(self.jitter * self.jitter_factor, self.min_delay), self.max_delay)
+        play = max(now + self.delay, self._last_play + self.period)
+        play = min(play, now + self.max_delay)
+        self._last_play = play
+        queue = self.queue
+        queue.append((play, payload, source))
+        if len(queue) > self.max_depth:
+            _, oldest, oldest_source = queue[0]
+            queue[0] = (now, oldest, oldest_source)
+
+    def pop_due(self, now: float):
+        """Returns the (payload, source) pairs whose playout time has come, oldest first."""
+        due = []
+        queue = self.queue
+        while queue and queue[0][0] <= now:
+            _, payload, source = queue.popleft()
+            due.append((payload, source))
+        return due
+
+    def stats(self) -> dict:
+        return {"depth": len(self.queue), "delay": self.delay, "period": self.period, "jitter": self.jitter}
+
+
+class SafetyWatchdog:
+    """Tiered signal-loss handling on the monotonic clock.
+
+    `fed` is set on every received batch, which keeps arming as cheap as an
+    attribute store. `poll(now)` runs every `check_interval` seconds from a
+    timer. After `timeout` seconds without a feed the watchdog walks three
+    tiers: HOLD (the device keeps its last position; the relay stops
+    vibration right away), RAMP to center over `ramp_time` after another
+    `hold_time`, then STOP once the ramp is over.
+    The `on_*` callbacks decide what goes on the wire; a feed during any tier
+    calls `on_restore` and re-arms.
+    """
+    ARMED, HOLD, RAMP, STOP = "armed", "hold", "ramp", "stop"
+
+    def __init__(self, timeout: float = 2.0, hold_time: float = 1.0, ramp_time: float = 2.0,
+                 check_interval: float = 0.1, on_hold=None, on_ramp=None, on_stop=None, on_restore=None):
+        self.timeout = timeout
+        self.hold_time = hold_time
+        self.ramp_time = ramp_time
+        self.check_interval = check_interval
+        self.on_hold = on_hold
+        self.on_ramp = on_ramp
+        self.on_stop = on_stop
+        self.on_restore = on_restore
+        self.fed = False
+        self.state = self.ARMED
+        self.last_feed = None
+
+    def poll(self, now: float):
+        if self.fed:
+            self.fed = False
+            self.last_feed = now
+            if self.state != self.ARMED:
+                self.state = self.ARMED
+                if self.on_restore:
+                    self.on_restore()
+            return
+        if self.last_feed is None:
+            # Nothing received yet: count from the first check.
+            self.last_feed = now
+            return
+        silent = now - self.last_feed
+        state = self.state
+        if state == self.ARMED and silent >= self.timeout:
+            self.state = self.HOLD
+            if self.on_hold:
+                self.on_hold()
+        elif state == self.HOLD and silent >= self.timeout + self.hold_time:
+            self.state = self.RAMP
+            if self.on_ramp:
+                self.on_ramp(self.ramp_time)
+        elif state == self.RAMP and silent >= self.timeout + self.hold_time + self.ramp_time:
+            self.state = self.STOP
+            if self.on_stop:
+                self.on_stop()
+
+
+class SerialWriter:
+    """Serial output stage fed by a single-slot, latest-frame-wins mailbox.
+
+    Merged axis frames replace any frame the device has not taken yet (the
+    superseded frame is folded in through `merge` so no axis is lost, and
+    counted in `frames_dropped`); control commands queue in order and are
+    never dropped. Runs on its own thread for the threaded engine, or from fd
+    writability callbacks once `attach`ed to the asyncio engine's loop.
+    `write_time` is an optional `relay_metrics.Histogram` for write durations.
+    """
+    def __init__(self, ser, merge=None, high_water: int = 64, write_time=None):
+        self.ser = ser
+        self.merge = merge
+        self.write_time = write_time
+        # Bytes allowed in the OS transmit queue before new frames are held back.
+        self.high_water = high_water
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.out_waiting = 0
+        self.running = False
+        self._frame = None
+        self._commands = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        # Asyncio mode
+        self._loop = None
+        self._fd = None
+        self._tx = bytearray()
+
+    def submit(self, frame: bytes):
+        """Offers a merged frame; replaces the unsent one instead of queueing behind it."""
+        with self._cond:
+            if self._frame is not None:
+                self.frames_dropped += 1
+                if self.merge:
+                    frame = self.merge(self._frame, frame)
+            self._frame = frame
+            self._cond.notify()
+        if self._loop:
+            self._kick()
+
+    def send(self, command: bytes):
+        """Queues a control command; written in order, ahead of pending frames."""
+        with self._cond:
+            self._commands.append(command)
+            self._cond.notify()
+        if self._loop:
+            self._kick()
+
+    def _take(self):
+        # Callers hold self._cond.
+        if self._commands:
+            return self._commands.popleft()
+        frame = self._frame
+        self._frame = None
+        return frame
+
+    # Threaded engine
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self.running:
+            with self._cond:
+                self.running = False
+                self._cond.notify()
+            if self._thread:
+                self._thread.join(timeout=1)
+                self._thread = None
+
+    def _run(self):
+        cond = self._cond
+        while True:
+            with cond:
+                while self.running and self._frame is None and not self._commands:
+                    cond.wait()
+                if not self.running:
+                    return
+                is_frame = not self._commands
+                data = self._take()
+            write_time = self.write_time
+            started = time.perf_counter_ns() if write_time else 0
+            try:
+                self.ser.write(data)
+                if is_frame:
+                    self.frames_written += 1
+                if write_time:
+                    write_time.record(time.perf_counter_ns() - started)
+            except Exception as e:
+                logger.error(f"Serial send failed: {e}")
+            self._wait_for_room()
+
+    def _wait_for_room(self):
+        """Holds off while the OS queue is above `high_water`, letting the mailbox coalesce."""
+        try:
+            waiting = self.ser.out_waiting
+            self.out_waiting = waiting
+            if waiting > self.high_water:
+                time.sleep((waiting - self.high_water) * 10 / self.ser.baudrate)
+        except Exception:
+            # out_waiting is not supported by every port/driver.
+            pass
+
+    # Asyncio engine
+
+    def attach(self, loop, fd: int):
+        self._loop = loop
+        self._fd = fd
+
+    def detach(self):
+        if self._loop:
+            self._loop.remove_writer(self._fd)
+            self._loop = None
+            self._fd = None
+            self._tx.clear()
+
+    def _kick(self):
+        """Writes queued commands, then the pending frame, until the port takes a partial write."""
+        if self._tx:
+            # Writer callback already armed; the mailbox is drained from there.
+            return
+        write_time = self.write_time
+        while True:
+            with self._cond:
+                is_frame = not self._commands
+                data = self._take()
+            if data is None:
+                break
+            started = time.perf_counter_ns() if write_time else 0
+            try:
+                written = os.write(self._fd, data)
+            except BlockingIOError:
+                written = 0
+            except OSError as e:
+                logger.error(f"Serial send failed: {e}")
+                continue
+            if write_time:
+                write_time.record(time.perf_counter_ns() - started)
+            if is_frame:
+                self.frames_written += 1
+            if written < len(data):
+                self._tx += data[written:]
+                self._loop.add_writer(self._fd, self._on_writable)
+                break
+        self.out_waiting = len(self._tx)
+
+    def _on_writable(self):
+        try:
+            written = os.write(self._fd, self._tx)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.error(f"Serial send failed: {e}")
+            written = len(self._tx)
+        del self._tx[:written]
+        self.out_waiting = len(self._tx)
+        if not self._tx:
+            self._loop.remove_writer(self._fd)
+            self._kick()
+
+
+def parse_axis_routes(spec: str):
+    """Parses `L0>A:L0, L1>B:L0` into {device: [(source slot, device slot), ...]}.
+
+    `->` and `→` are accepted for `>`. The device axis defaults to the source
+    axis (`R0>B` forwards R0 to B unchanged) and `*>B` forwards every axis.
+    """
+    routes = {}
+    for entry in spec.replace("→", ">").replace("->", ">").split(","):
+        entry = "".join(entry.split())
+        if not entry:
+            continue
+        src, sep, target = entry.partition(">")
+        device, _, dst = target.partition(":")
+        if not sep or not device:
+            raise ValueError(f"Invalid axis route: {entry!r}")
+        route = routes.setdefault(device, [])
+        if src == "*" and not dst:
+            route.extend((slot, slot) for slot in range(AXIS_COUNT))
+            continue
+        src_slot = AXIS_SLOTS.get(src.upper().encode())
+        dst_slot = AXIS_SLOTS.get((dst or src).upper().encode())
+        if src_slot is None or dst_slot is None:
+            raise ValueError(f"Invalid axis route: {entry!r}")
+        route.append((src_slot, dst_slot))
+    return routes
+
+
+class SerialDevice:
+    """One serial output of a multi-device relay and the axes routed to it.
+
+    `route` is a list of (source slot, device slot) pairs taken from the merged
+    axis table; None passes every axis through unchanged. Each device keeps its
+    own `AxisTable`, so delta output is tracked per device.
+    """
+    def __init__(self, name: str, port: str, route=None, delta: bool = False, refresh_interval: float = 0):
+        self.name = name
+        self.port = port
+        self.route = route
+        self.route_mask = ALL_AXES
+        if route is not None:
+            self.route_mask = 0
+            for src, _ in route:
+                self.route_mask |= 1 << src
+        self.axes = AxisTable(delta=delta, refresh_interval=refresh_interval)
+        self.ser = None
+        self.writer = None
+        # Asyncio engine fd and partial feedback line
+        self.fd = None
+        self.rx = bytearray()
+
+    def apply(self, mask: int, values):
+        """Copies the routed axes in `mask` from the merged `values`; returns the device frame or None."""
+        mask &= self.route_mask
+        if mask:
+            dst = self.axes.values
+            changed = 0
+            if self.route is None:
+                changed = mask
+                while mask:
+                    low = mask & -mask
+                    slot = low.bit_length() - 1
+                    dst[slot] = values[slot]
+                    mask ^= low
+            else:
+                for src, slot in self.route:
+                    if mask >> src & 1:
+                        dst[slot] = values[src]
+                        changed |= 1 << slot
+            self.axes.dirty |= changed
+            self.axes.known |= changed
+        return self.axes.emit()
+
+
+class UdpSource:
+    """One UDP listen endpoint with its own axis state and an arbitration priority.
+
+    `stamps` records when (monotonic) the source last drove each axis slot.
+    """
+    def __init__(self, ip: str, port: int, priority: int = 0):
+        self.ip = ip
+        self.port = port
+        self.priority = priority
+        self.sock = None
+        self.axes = AxisTable()
+        self.stamps = [0.0] * AXIS_COUNT
+        self.last_addr = None
+
 
 class UdpToSerialRelay:
-    def __init__(self, udp_ip: str, udp_port: int, serial_port: str, baud_rate: int, dummy: bool = False, verbose: bool = False, ws_server: TCodeWSServer = None):
+    def __init__(self, udp_ip: str, udp_port: int, serial_port: str, baud_rate: int, dummy: bool = False, verbose: bool = False, ws_server: TCodeWSServer = None,
+                 use_asyncio: bool = False, output_rate_hz: float = 0, regex_parser: bool = False,
+                 delta_output: bool = False, full_refresh_interval: float = 0,
+                 devices: dict = None, routes=None, sources: list = None, source_timeout: float = 0.5,
+                 interpolation: str = None, jitter_delay: float = 0, adaptive_jitter: bool = False,
+                 merge_policies=None, watchdog_timeout: float = 2.0, watchdog_hold: float = 1.0,
+                 watchdog_ramp: float = 2.0, capture_path: str = None, metrics: bool = False,
+                 metrics_port: int = None, metrics_host: str = "127.0.0.1", position_log_interval: float = 0.1):
         self.ws_server = ws_server
         self.udp_ip = udp_ip
         self.udp_port = udp_port
@@ -91,13 +1243,103 @@ class UdpToSerialRelay:
         self.baud_rate = baud_rate
         self.dummy = dummy
         self.verbose = verbose
+        # Verbose `-> frame` logs are sampled: at most one per interval (0 = every frame).
+        self.position_log_interval = position_log_interval
+        self._next_position_log = 0.0
+        self._positions_skipped = 0
+        self.use_asyncio = use_asyncio
+        # 0 writes a frame on every network wakeup; >0 sends one merged frame per tick.
+        self.scheduler = OutputScheduler(output_rate_hz, baud_rate) if output_rate_hz > 0 else None
+        self.tokenize = tokenize_tcode_regex if regex_parser else tokenize_tcode
+        # Extra serial devices by name; the primary `serial_port` is device "A".
+        # `routes` (spec string or parsed dict) picks the axes each device gets.
+        if isinstance(routes, str):
+            routes = parse_axis_routes(routes)
+        self.outputs = []
+        if devices or routes:
+            ports = {"A": serial_port, **(devices or {})}
+            unknown = set(routes or ()) - set(ports)
+            if unknown:
+                raise ValueError(f"Routes for unknown device(s): {', '.join(sorted(unknown))}")
+            for name, port in ports.items():
+                route = None if routes is None else routes.get(name, [])
+                self.outputs.append(SerialDevice(name, port, route, delta_output, full_refresh_interval))
+        # Optional upsampling of sparse targets to the scheduler rate ("linear" or "cubic").
+        self.interpolator = None
+        if interpolation:
+            if not self.scheduler:
+                raise ValueError("Interpolation needs a fixed output rate (output_rate_hz > 0)")
+            self.interpolator = AxisInterpolator(interpolation, delta=delta_output and not self.outputs,
+                                                 refresh_interval=0 if self.outputs else full_refresh_interval)
+        # Optional jitter buffer: datagrams are held for a (fixed or adaptive) playout
+        # delay and released on scheduler ticks instead of merged on arrival.
+        self.jitter = None
+        if jitter_delay > 0 or adaptive_jitter:
+            if not self.scheduler:
+                raise ValueError("The jitter buffer needs a fixed output rate (output_rate_hz > 0)")
+            self.jitter = JitterBuffer(jitter_delay, adaptive=adaptive_jitter)
+        # Per-axis I/S merge policies (spec string or {slot: policy}); axes without one are last-wins.
+        if isinstance(merge_policies, str):
+            merge_policies = parse_merge_policies(merge_policies)
+        if merge_policies and self.interpolator:
+            raise ValueError("I/S merge policies do nothing with interpolation (the relay does the timing)")
+        merger = IntervalMerger(merge_policies) if merge_policies else None
+        # Persistent axis state; with delta_output only changed axes go on the wire.
+        # With several devices the axes are merged once here and filtered per device.
+        if self.outputs or self.interpolator:
+            self.axes = AxisTable(merger=merger)
+        else:
+            self.axes = AxisTable(delta=delta_output, refresh_interval=full_refresh_interval, merger=merger)
+        # Table behind the frames that go out (`emitted` and `values` of the last frame).
+        self.output_axes = self.interpolator.out if self.interpolator else self.axes
+        self._rx_view = memoryview(bytearray(UDP_RING_SIZE))
+        # Extra (ip, port, priority) listen endpoints; the primary endpoint has priority 0.
+        # A source keeps the axes it drives against lower priorities until it has
+        # been silent on them for `source_timeout` seconds.
+        self.sources = []
+        if sources:
+            self.sources = [UdpSource(udp_ip, udp_port)] + [UdpSource(*source) for source in sources]
+            # Each source accumulates its own suffixes; `_commit_source` hands over
+            # those of the axes it wins, and the merged table rewrites them on emit.
+            if merger:
+                for source in self.sources:
+                    source.axes.merger = IntervalMerger(merge_policies)
+        self.source_timeout = source_timeout
+        self._owners = [None] * AXIS_COUNT
+        self._reply_sock = None
+        # Every received datagram is appended here (see `udp_capture.py` to replay it).
+        self.capture_path = capture_path
+        self.capture = None
+        # Per-stage histograms and counters (relay_metrics.py); None costs one check per batch.
+        self.metrics = RelayMetrics() if metrics or metrics_port is not None else None
+        # Prometheus endpoint on the relay loop (0 = ephemeral port)
+        self.metrics_server = None
+        if metrics_port is not None:
+            if not use_asyncio:
+                raise ValueError("The metrics endpoint needs the asyncio engine (use_asyncio=True)")
+            self.metrics_server = MetricsServer(self.metrics_text, metrics_host, metrics_port)
         
         self.sock = None
         self.ser = None
         self.running = False
         self.last_udp_addr = None
-        self.last_receive_time = time.time()
-        self.watchdog_triggered = False
+        # Signal loss: hold, then ramp to center over `watchdog_ramp` seconds, then stop.
+        self.watchdog = SafetyWatchdog(watchdog_timeout, watchdog_hold, watchdog_ramp,
+                                       on_hold=self._watchdog_hold, on_ramp=self._watchdog_ramp,
+                                       on_stop=self._watchdog_stop, on_restore=self._watchdog_restore)
+
+        # Asyncio engine state (unused by the threaded engine)
+        self.loop = None
+        self._loop_thread_id = None
+        self._serial_fd = None
+        self._serial_rx = bytearray()
+        self.writer = None
+        self._serial_write = self._blocking_serial_write
+        self._submit_frame = self._blocking_serial_write
+        self._tick_handle = None
+        # Threaded engine: commands from other threads, written by the select loop
+        self._relay_thread_id = None
+        self._pending_commands = deque()
 
     def setup_connections(self):
         try:
@@ -106,6 +1348,17 @@ class UdpToSerialRelay:
                 self.sock.bind((self.udp_ip, self.udp_port))
                 self.sock.setblocking(False)
             logger.info(f"UDP listening on: {self.udp_ip}:{self.udp_port}")
+            if self.capture_path and not self.capture:
+                self.capture = CaptureWriter(self.capture_path)
+                logger.info(f"Capturing UDP to: {self.capture_path}")
+            if self.sources:
+                self.sources[0].sock = self.sock
+                for source in self.sources[1:]:
+                    if not source.sock:
+                        source.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                        source.sock.bind((source.ip, source.port))
+                        source.sock.setblocking(False)
+                    logger.info(f"UDP listening on: {source.ip}:{source.port} (priority {source.priority})")
 
             if self.dummy:
                 logger.warning("DUMMY mode - Only UDP testing will be performed")
@@ -117,15 +1370,44 @@ class UdpToSerialRelay:
                 timeout=0.01, # Short timeout for reading
                 write_timeout=0.1
             )
+            if self.outputs:
+                self.outputs[0].ser = self.ser
+                for device in self.outputs[1:]:
+                    device.ser = serial.Serial(
+                        port=device.port,
+                        baudrate=self.baud_rate,
+                        timeout=0.01,
+                        write_timeout=0.1
+                    )
             time.sleep(1) 
             logger.info(f"Serial connection successful: {self.serial_port_name}")
+            for device in self.outputs[1:]:
+                logger.info(f"Serial connection successful: {device.port} (device {device.name})")
             self.send_serial_cmd("L05000 R15000 V00000") # Center device
 
         except Exception as e:
             if not self.dummy:
                 logger.error(f"Connection failed: {e}")
+                # Release whatever was opened before the failure (primary port, sockets).
+                self._close_connections()
                 raise
 
+    def _close_connections(self):
+        if self.ser:
+            self.ser.close()
+            self.ser = None
+        for device in self.outputs:
+            if device.ser:
+                device.ser.close()
+            device.ser = None
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+        for source in self.sources:
+            if source.sock:
+                source.sock.close()
+            source.sock = None
+
     def send_serial_cmd(self, cmd_str: str):
         """Sends a command to the serial port, ensuring correct format"""
         if self.dummy or not self.ser or not self.ser.is_open:
@@ -135,35 +1417,460 @@ class UdpToSerialRelay:
         try:
             if hasattr(self, 'ws_server') and self.ws_server:
                 self.ws_server.broadcast(cmd_str.strip())
-            self.ser.write(cmd_str.encode())
+            if self.loop and self._loop_thread_id != threading.get_ident():
+                # Manual commands from the GUI thread are handed to the relay loop.
+                self.loop.call_soon_threadsafe(self._write_command, cmd_str.encode())
+            elif self._relay_thread_id not in (None, threading.get_ident()):
+                # Threaded engine: the select loop writes it between batches.
+                self._pending_commands.append(cmd_str.encode())
+            else:
+                self._write_command(cmd_str.encode())
         except Exception as e:
             logger.error(f"Serial send failed: {e}")
 
+    def _write_command(self, data: bytes):
+        # The command bypasses the axis tables, so the axes it moves no longer
+        # match `sent`; forgetting them makes delta output resend the next value.
+        slots = [None] * AXIS_COUNT
+        mask = self.tokenize(data, slots)
+        if mask:
+            for table in self._output_tables():
+                sent = table.sent
+                pending = mask
+                while pending:
+                    low = pending & -pending
+                    sent[low.bit_length() - 1] = None
+                    pending ^= low
+        self._serial_write(data)
+
+    def _blocking_serial_write(self, data: bytes):
+        if self.outputs:
+            # Commands (manual, watchdog, centering) go to every device unrouted.
+            for device in self.outputs:
+                if device.writer:
+                    device.writer.send(data)
+                elif device.ser:
+                    device.ser.write(data)
+            return
+        self.ser.write(data)
+
+    def _write_histogram(self, device: str):
+        return self.metrics.writer_histogram(device) if self.metrics else None
+
+    def _start_writer(self):
+        """Moves serial writes off the intake path onto a `SerialWriter`."""
+        self.writer = SerialWriter(self.ser, merge=self._merge_frames,
+                                   write_time=self._write_histogram(self.outputs[0].name if self.outputs else "A"))
+        self._serial_write = self.writer.send
+        self._submit_frame = self.writer.submit
+        if self.outputs:
+            self.outputs[0].writer = self.writer
+            self._serial_write = self._blocking_serial_write
+        return self.writer
+
+    def _start_devices(self):
+        """Gives every secondary device its own writer and feedback reader.
+
+        Devices with a selectable fd join the asyncio loop; otherwise (threaded
+        engine, Windows) each gets a writer thread and a reader thread.
+        """
+        for device in self.outputs[1:]:
+            device.writer = SerialWriter(device.ser, merge=self._merge_frames, write_time=self._write_histogram(device.name))
+            fd = None
+            if self.loop:
+                try:
+                    fd = device.ser.fileno()
+                except (AttributeError, OSError):
+                    fd = None
+            if fd is None:
+                device.writer.start()
+                threading.Thread(target=self.serial_to_udp_loop, args=(device.ser,), daemon=True).start()
+                continue
+            device.fd = fd
+            device.ser.timeout = 0
+            device.ser.write_timeout = 0
+            device.writer.attach(self.loop, fd)
+            self.loop.add_reader(fd, self._on_serial_readable, fd, device.rx)
+
+    def _stop_writer(self):
+        for device in self.outputs:
+            if device.writer and device.writer is not self.writer:
+                device.writer.stop()
+                device.writer.detach()
+            device.writer = None
+        if self.writer:
+            self.writer.stop()
+            self.writer.detach()
+            self.writer = None
+        self._serial_write = self._blocking_serial_write
+        self._submit_frame = self._blocking_serial_write
+
+    def _merge_frames(self, old: bytes, new: bytes) -> bytes:
+        # Last-wins per axis, so axes only present in the superseded frame survive.
+        slots = [None] * AXIS_COUNT
+        found = self.tokenize(old + new, slots)
+        return format_tcode_frame(found, slots) if found else new
+
     def process_tcode_buffer(self, packets):
         """Axis command merging logic
 
-        ⚡ Optimized: Joins packets before decoding/regex parsing to reduce overhead.
-        This batch processing approach is ~60-65% faster for large buffers.
+        ⚡ Optimized: Joins packets once and tokenizes the batch straight into the
+        persistent axis table (last value per axis wins), no per-batch dict.
         """
         if not packets:
             return None
 
         # ⚡ Optimized: Join directly without adding spaces (`b"".join` instead of `b" ".join`).
-        combined_packet = b"".join(packets)
-        # ⚡ Optimized: Strip spaces in C-backed byte domain.
-        # Evaluate regex directly on bytes to avoid string decode overhead.
-        axis_state = dict(TCODE_REGEX_BYTES.findall(combined_packet.replace(b" ", b"")))
-
-        if not axis_state:
-            return None
-        
-        # ⚡ Optimized: Direct string concatenation instead of f-string.
-        # Join bytes, then uppercase and decode as ASCII just before returning.
+        self.axes.update(b"".join(packets), self.tokenize)
+        frame = self.axes.emit()
         # ASCII decoding is faster than UTF-8 and safe for T-Code.
-        # ⚡ Bolt: Appending newline in bytes domain before decoding avoids creating an intermediate string object.
-        return (b" ".join([axis + cmd for axis, cmd in axis_state.items()]).upper() + b"\n").decode('ascii', errors='replace')
+        return frame.decode('ascii') if frame else None
+
+    def _drain_udp(self, source: UdpSource = None):
+        """Reads every datagram currently queued on the non-blocking socket.
+
+        ⚡ Zero-copy intake: datagrams land back to back in the preallocated
+        receive ring via `recvfrom_into`, so the batch is already "joined" and is
+        tokenized straight from a memoryview, with no per-packet bytes objects.
+        With several sources the batch goes into the `source` table first and is
+        arbitrated into the merged one. Returns the number of datagrams read.
+        """
+        sock = source.sock if source else self.sock
+        table = source.axes if source else self.axes
+        jitter = self.jitter
+        capture = self.capture
+        metrics = self.metrics
+        started = time.perf_counter_ns() if metrics else 0
+        # Everything read in one drain arrived together.
+        now = time.monotonic() if jitter else 0.0
+        now_ns = time.monotonic_ns() if capture else 0
+        view = self._rx_view
+        # Tokenize and rewind before a maximum-size datagram could overrun the ring.
+        limit = len(view) - UDP_MAX_DATAGRAM
+        # ⚡ Optimized: Cache bound methods and consolidate exceptions
+        # to OSError for ~5-15% faster iterations in the tight UDP reading loop.
+        # ⚡ Bolt: Cache addr update in a local variable to avoid self attribute lookup/assignment overhead on every packet.
+        recvfrom_into = sock.recvfrom_into
+        pos = 0
+        count = 0
+        received = 0
+        last_addr = None
+        while True:
+            try:
+                nbytes, addr = recvfrom_into(view[pos:], UDP_MAX_DATAGRAM)
+            except OSError:
+                break
+            # 0-byte keep-alives are legitimate and must be ignored.
+            if nbytes:
+                count += 1
+                received += nbytes
+                last_addr = addr
+                if capture:
+                    capture.write(now_ns, addr, view[pos:pos + nbytes])
+                if jitter:
+                    # Buffered datagrams are kept apart so none of their motion is merged away.
+                    jitter.push(bytes(view[pos:pos + nbytes]), source, now)
+                    continue
+                pos += nbytes
+                if pos > limit:
+                    table.update(view[:pos], self.tokenize)
+                    pos = 0
+
+        if pos:
+            table.update(view[:pos], self.tokenize)
+        if source is None:
+            if last_addr is not None:
+                self.last_udp_addr = last_addr
+        else:
+            if last_addr is not None:
+                source.last_addr = last_addr
+            if not jitter:
+                self._commit_source(source)
+        if metrics and count:
+            metrics.on_batch(count, received, time.perf_counter_ns() - started)
+        return count
+
+    def _commit_source(self, source: UdpSource):
+        """Arbitrates the axes a source has updated into the merged table."""
+        table = source.axes
+        mask = table.dirty
+        table.dirty = 0
+        won = self._arbitrate(source, mask, time.monotonic()) if mask else 0
+        if table.merger:
+            self.axes.merger.take(table.merger, mask, won)
+        if won:
+            # Feedback goes to whoever is driving the device, from the port it sent to.
+            self.last_udp_addr = source.last_addr
+            self._reply_sock = source.sock
+
+    def _play_out(self, now: float):
+        """Feeds the jitter-buffered datagrams that are due into the axis tables."""
+        for payload, source in self.jitter.pop_due(now):
+            if source is None:
+                self.axes.update(payload, self.tokenize)
+            else:
+                source.axes.update(payload, self.tokenize)
+                self._commit_source(source)
+
+    def _arbitrate(self, source: UdpSource, mask: int, now: float) -> int:
+        """Copies the axes in `mask` from `source` into the merged table where it may drive them.
+
+        An axis stays with its owner while the owner keeps driving it. A source of
+        equal or higher priority takes it over at once; a lower one only after the
+        owner has been silent on it for `source_timeout`. Costs O(axes in the batch)
+        and returns the mask of axes the source won.
+        """
+        owners = self._owners
+        values = self.axes.values
+        src_values = source.axes.values
+        stamps = source.stamps
+        priority = source.priority
+        timeout = self.source_timeout
+        won = 0
+        while mask:
+            low = mask & -mask
+            slot = low.bit_length() - 1
+            mask ^= low
+            stamps[slot] = now
+            owner = owners[slot]
+            if (owner is not None and owner is not source and owner.priority > priority
+                    and now - owner.stamps[slot] < timeout):
+                continue
+            owners[slot] = source
+            values[slot] = src_values[slot]
+            won |= low
+        self.axes.dirty |= won
+        self.axes.known |= won
+        return won
+
+    def _udp_sockets(self):
+        """(socket, source) pairs to listen on; source is None for a single endpoint."""
+        if not self.sources:
+            return [(self.sock, None)]
+        return [(source.sock, source) for source in self.sources]
+
+    def _drain_readable(self, readable):
+        count = 0
+        for sock, source in self._udp_sockets():
+            if sock in readable:
+                count += self._drain_udp(source)
+        return count
+
+    def _on_batch(self):
+        """Forwards the axes updated by a received batch to serial and WS.
+
+        With a scheduler the batch only updates the axis table; `_on_tick` sends it.
+        """
+        # ⚡ Arming the watchdog is a flag store; no clock read on the hot path.
+        self.watchdog.fed = True
+        if self.jitter:
+            return
+        if self.interpolator:
+            self._feed_interpolator(time.monotonic())
+        elif not self.scheduler:
+            metrics = self.metrics
+            started = time.perf_counter_ns() if metrics else 0
+            frame = self.axes.emit()
+            if metrics:
+                metrics.merge.record(time.perf_counter_ns() - started)
+            self._emit_frame(frame)
+
+    def _feed_interpolator(self, now: float):
+        mask = self.axes.dirty
+        self.axes.dirty = 0
+        self.interpolator.add(mask, self.axes.values, now)
+
+    def _emit_frame(self, frame):
+        if not frame:
+            return 0
+        # ⚡ Optimized: Decode once (without the newline) for the WS and log sinks.
+        stripped_cmd = frame[:-1].decode('ascii')
+        metrics = self.metrics
+        if metrics:
+            metrics.on_frame(len(frame))
+        if self.ws_server:
+            started = time.perf_counter_ns() if metrics else 0
+            self.ws_server.broadcast(stripped_cmd)
+            if metrics:
+                metrics.ws_broadcast.record(time.perf_counter_ns() - started)
+        if not self.dummy and self.ser:
+            if self.outputs:
+                self._fan_out()
+            else:
+                self._submit_frame(frame)
+        if self.verbose:
+            self._log_position(stripped_cmd)
+        return len(frame)
+
+    def _log_position(self, cmd: str):
+        """Rate-limited `-> frame` log; frames in between are only counted, never formatted."""
+        now = time.monotonic()
+        if now < self._next_position_log:
+            self._positions_skipped += 1
+            return
+        self._next_position_log = now + self.position_log_interval
+        skipped = self._positions_skipped
+        self._positions_skipped = 0
+        if skipped:
+            logger.info("-> %s (+%d not logged)", cmd, skipped, extra=POSITION_LOG)
+        else:
+            logger.info("-> %s", cmd, extra=POSITION_LOG)
+
+    def _fan_out(self):
+        """Routes the axes just emitted by the merged table to every device.
+
+        All devices are fed from the same merge, in the same batch or tick, so
+        they stay in phase with each other.
+        """
+        mask = self.output_axes.emitted
+        values = self.output_axes.values
+        for device in self.outputs:
+            frame = device.apply(mask, values)
+            if not frame:
+                continue
+            if device.writer:
+                device.writer.submit(frame)
+            else:
+                device.ser.write(frame)
+
+    def _on_tick(self, now: float):
+        """Sends exactly one merged frame for everything received since the last tick."""
+        if self.jitter:
+            self._play_out(now)
+            if self.interpolator:
+                self._feed_interpolator(now)
+        metrics = self.metrics
+        started = time.perf_counter_ns() if metrics else 0
+        if self.interpolator:
+            frame = self.interpolator.emit(now)
+        else:
+            frame = self.axes.emit()
+        if metrics:
+            metrics.merge.record(time.perf_counter_ns() - started)
+        self.scheduler.advance(now, self._emit_frame(frame))
+
+    def metrics_text(self) -> str:
+        """Prometheus text for the metrics endpoint.
+
+        Only reads: counter attributes, histogram snapshots and the writers'
+        published counters; nothing on the data path is locked or reset.
+        """
+        snap = self.metrics.snapshot()
+        out = PrometheusText()
+        out.metric("packets_received_total", "counter", "UDP datagrams received.", snap["packets"])
+        out.metric("batches_total", "counter", "Receive batches drained.", snap["batches"])
+        out.metric("bytes_received_total", "counter", "UDP payload bytes received.", snap["bytes_in"])
+        out.metric("frames_emitted_total", "counter", "Merged frames produced.", snap["frames"])
+        out.metric("bytes_emitted_total", "counter", "Bytes of merged frames produced.", snap["bytes_out"])
+        out.metric("merge_ratio", "gauge", "Datagrams per merged frame.", snap["merge_ratio"])
+        out.metric("feedback_lines_total", "counter", "Feedback lines read from the device.", snap["feedback_lines"])
+        out.metric("watchdog_trips_total", "counter", "Signal losses detected by the watchdog.", snap["watchdog_trips"])
+        out.metric("watchdog_state", "gauge", "Current watchdog tier (1 = active).",
+                   [({"state": state}, int(self.watchdog.state == state))
+                    for state in (SafetyWatchdog.ARMED, SafetyWatchdog.HOLD, SafetyWatchdog.RAMP, SafetyWatchdog.STOP)])
+        writers = [(device.name, device.writer) for device in self.outputs if device.writer]
+        if not self.outputs and self.writer:
+            writers = [("A", self.writer)]
+        out.metric("frames_written_total", "counter", "Frames written to the serial port.",
+                   [({"device": name}, writer.frames_written) for name, writer in writers])
+        out.metric("frames_dropped_total", "counter", "Frames superseded before the port took them.",
+                   [({"device": name}, writer.frames_dropped) for name, writer in writers])
+        out.metric("serial_out_waiting_bytes", "gauge", "Bytes queued for the serial port at the last write.",
+                   [({"device": name}, writer.out_waiting) for name, writer in writers])
+        if self.ws_server:
+            clients = self.ws_server.client_stats()
+            out.metric("ws_clients", "gauge", "Connected WebSocket clients.", len(clients))
+            labelled = [({"client": f"{addr[0]}:{addr[1]}" if addr else "?"}, depth, dropped)
+                        for addr, depth, dropped in clients]
+            out.metric("ws_client_queue_depth", "gauge", "Messages queued per WebSocket client.",
+                       [(labels, depth) for labels, depth, _ in labelled])
+            out.metric("ws_client_dropped_total", "counter", "Messages dropped per WebSocket client.",
+                       [(labels, dropped) for labels, _, dropped in labelled])
+        if self.jitter:
+            stats = self.jitter.stats()
+            out.metric("jitter_depth", "gauge", "Datagrams held in the jitter buffer.", stats["depth"])
+            out.metric("jitter_delay_seconds", "gauge", "Current playout delay.", stats["delay"])
+            out.metric("jitter_seconds", "gauge", "Measured arrival jitter.", stats["jitter"])
+        # Serial writes are timed per device, one histogram per writer.
+        stages = [({"stage": name}, hist) for name, hist in snap["stages"].items() if name != "serial_write"]
+        stages += [({"stage": "serial_write", "device": device}, hist) for device, hist in snap["serial_write"].items()]
+        out.histogram("stage_seconds", "Time spent per relay stage.", stages, SECONDS_BOUNDS, 1e-9)
+        out.histogram("batch_packets", "Datagrams per receive batch.", [({}, snap["batch_size"])], COUNT_BOUNDS)
+        return out.text()
+
+    def _output_tables(self):
+        """Every table whose `values`/`sent` mirror what the device(s) were last told."""
+        tables = [self.axes]
+        if self.output_axes is not self.axes:
+            tables.append(self.output_axes)
+        return tables + [device.axes for device in self.outputs]
+
+    def _force_axes(self, mask: int, value: bytes):
+        """Records a watchdog command: the slots in `mask` now hold `value` on the device."""
+        if self.interpolator:
+            self.interpolator.reset(mask, int(value) / 10 ** len(value), time.monotonic())
+        for table in self._output_tables():
+            values = table.values
+            sent = table.sent
+            pending = mask
+            while pending:
+                low = pending & -pending
+                slot = low.bit_length() - 1
+                values[slot] = sent[slot] = value
+                pending ^= low
+
+    def _watchdog_hold(self):
+        if self.metrics:
+            self.metrics.watchdog_trips += 1
+        # A full refresh would resend the pre-loss positions over the watchdog's commands.
+        for table in self._output_tables():
+            table.refresh_enabled = False
+        # Vibration stops at once; only the motion axes hold, then ramp.
+        self._stop_vibration()
+        logger.warning("Signal lost - holding position, vibration stopped")
+
+    def _watchdog_ramp(self, ramp_time: float):
+        """Moves every known linear/rotary axis to center over `ramp_time` instead of jumping."""
+        interval = b"I%d" % int(ramp_time * 1000)
+        # L0-L9 and R0-R9 are the first 20 slots.
+        mask = self.axes.known & ((1 << 20) - 1) or 1
+        centered = mask
+        parts = []
+        while mask:
+            low = mask & -mask
+            parts.append(AXIS_NAMES[low.bit_length() - 1] + b"5000" + interval)
+            mask ^= low
+        self.send_serial_cmd(b" ".join(parts).decode('ascii'))
+        # The tables follow the device, so delta output and refreshes start from center.
+        self._force_axes(centered, b"5000")
+        logger.warning("Device centering (waiting for signal...)")
+
+    def _watchdog_stop(self):
+        # Repeated in case the stop sent on hold was lost (e.g. a write timeout).
+        self._stop_vibration()
+        logger.warning("Device stopped (waiting for signal...)")
+
+    def _stop_vibration(self):
+        # V0-V9 are slots 20-29.
+        mask = (self.axes.known >> 20) & 0x3FF or 1
+        stopped = mask << 20
+        parts = []
+        while mask:
+            low = mask & -mask
+            parts.append(AXIS_NAMES[20 + low.bit_length() - 1] + b"0000")
+            mask ^= low
+        self.send_serial_cmd(b" ".join(parts).decode('ascii'))
+        self._force_axes(stopped, b"0000")
+
+    def _watchdog_restore(self):
+        for table in self._output_tables():
+            table.refresh_enabled = True
+        logger.info("Signal restored")
 
     def run(self):
+        if self.use_asyncio:
+            return self.run_async()
+
         try:
             self.setup_connections()
         except Exception:
@@ -176,75 +1883,201 @@ class UdpToSerialRelay:
         # Start serial reading thread (for UDP feedback)
         serial_thread = threading.Thread(target=self.serial_to_udp_loop, daemon=True)
         serial_thread.start()
+        if not self.dummy and self.ser:
+            self._start_writer().start()
+            self._start_devices()
+
+        scheduler = self.scheduler
+        select_timeout = 0.01
+        socks = [sock for sock, _ in self._udp_sockets()]
+        if scheduler:
+            scheduler.start(time.monotonic())
+        # The watchdog tiers and manual commands rewrite the axis tables, so they
+        # run here between batches rather than on the threads that trigger them.
+        watchdog = self.watchdog
+        next_check = time.monotonic() + watchdog.check_interval
+        commands = self._pending_commands
+        self._relay_thread_id = threading.get_ident()
 
         while self.running:
             try:
-                readable, _, _ = select.select([self.sock], [], [], 0.01)
+                if scheduler:
+                    select_timeout = min(scheduler.timeout(time.monotonic()), 0.01)
+                readable, _, _ = select.select(socks, [], [], select_timeout)
                 
-                if readable:
-                    packets = []
-                    # ⚡ Optimized: Cache list append and consolidate exceptions
-                    # to OSError for ~5-15% faster iterations in the tight UDP reading loop.
-                    # ⚡ Bolt: Cache addr update in a local variable to avoid self attribute lookup/assignment overhead on every packet.
-                    recvfrom = self.sock.recvfrom
-                    append_packet = packets.append
-                    last_addr = None
-                    while True:
-                        try:
-                            data, addr = recvfrom(4096)
-                            if data:
-                                append_packet(data)
-                                last_addr = addr
-                        except OSError:
-                            break
-                    
-                    if last_addr is not None:
-                        self.last_udp_addr = last_addr
-
-                    if packets:
-                        # ⚡ Optimized: Moved system calls outside the tight socket reading loop
-                        self.last_receive_time = time.time()
-                        self.watchdog_triggered = False
-                        merged_cmd = self.process_tcode_buffer(packets)
-                        if merged_cmd:
-                            # ⚡ Optimized: Cache result of idempotent string operations in local variable
-                            stripped_cmd = merged_cmd.strip()
-                            if self.ws_server:
-                                self.ws_server.broadcast(stripped_cmd)
-                            if not self.dummy and self.ser:
-                                self.ser.write(merged_cmd.encode())
-                            if self.verbose:
-                                logger.info(f"-> {stripped_cmd}")
-
-                # Safety watchdog
-                if not self.watchdog_triggered and (time.time() - self.last_receive_time > 2.0):
-                    self.send_serial_cmd("L05000 V00000")
-                    self.watchdog_triggered = True
-                    logger.warning("Device centered (waiting for signal...)")
+                if readable and self._drain_readable(readable):
+                    self._on_batch()
+
+                while commands:
+                    self._write_command(commands.popleft())
+
+                now = time.monotonic()
+                if now >= next_check:
+                    next_check = now + watchdog.check_interval
+                    watchdog.poll(now)
+
+                if scheduler and now >= scheduler.next_tick:
+                    self._on_tick(now)
 
             except Exception as e:
                 logger.error(f"Main loop exception: {e}")
                 break
+        self._relay_thread_id = None
+        self.cleanup()
+
+    def run_async(self):
+        """Asyncio engine: UDP, serial and the WS server share a single event loop.
+
+        Replaces the 10 ms `select`/`readline` polling of the threaded engine with
+        fd readiness callbacks, so a datagram is forwarded as soon as it arrives.
+        """
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._loop_thread_id = threading.get_ident()
+        try:
+            self.loop.run_until_complete(self._serve_async())
+        except Exception as e:
+            logger.error(f"Main loop exception: {e}")
+        finally:
+            self.loop.close()
+            self.loop = None
+            self._loop_thread_id = None
         self.cleanup()
 
-    def serial_to_udp_loop(self):
-        """Reads feedback from serial and sends it back to the last UDP client"""
+    async def _serve_async(self):
+        loop = self.loop
+        try:
+            self.setup_connections()
+        except Exception:
+            self.running = False
+            return
+
+        self.running = True
+        if self.ws_server and not self.ws_server.running:
+            await self.ws_server.start_on_loop()
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start_on_loop()
+            except OSError as e:
+                logger.error(f"Metrics endpoint failed: {e}")
+
+        for sock, source in self._udp_sockets():
+            loop.add_reader(sock.fileno(), self._on_udp_readable, source)
+        if not self.dummy and self.ser:
+            self._attach_serial_fd()
+        if self.scheduler:
+            self.scheduler.start(loop.time())
+            self._tick_handle = loop.call_at(self.scheduler.next_tick, self._on_async_tick)
+        logger.info("Relay service started (asyncio engine)...")
+
+        try:
+            watchdog = self.watchdog
+            while self.running:
+                # Housekeeping only (watchdog, stop flag); the data path is event driven.
+                watchdog.poll(loop.time())
+                await asyncio.sleep(watchdog.check_interval)
+        finally:
+            if self._tick_handle:
+                self._tick_handle.cancel()
+                self._tick_handle = None
+            for sock, _ in self._udp_sockets():
+                loop.remove_reader(sock.fileno())
+            self._detach_serial_fd()
+            if self.metrics_server:
+                await self.metrics_server.close_on_loop()
+            if self.ws_server and self.ws_server.thread is None:
+                await self.ws_server.close_on_loop()
+
+    def _on_async_tick(self):
+        self._on_tick(self.loop.time())
+        # ⚡ Absolute deadlines: call_at on the scheduler clock, so ticks never drift.
+        self._tick_handle = self.loop.call_at(self.scheduler.next_tick, self._on_async_tick)
+
+    def _attach_serial_fd(self):
+        """Switches the serial port to non-blocking fd callbacks on the relay loop."""
+        try:
+            self._serial_fd = self.ser.fileno()
+        except (AttributeError, OSError):
+            # No selectable fd (e.g. Windows): writer and reader run on their own threads.
+            self._start_writer().start()
+            threading.Thread(target=self.serial_to_udp_loop, daemon=True).start()
+            self._start_devices()
+            return
+        self.ser.timeout = 0
+        self.ser.write_timeout = 0
+        self._start_writer().attach(self.loop, self._serial_fd)
+        self.loop.add_reader(self._serial_fd, self._on_serial_readable)
+        self._start_devices()
+
+    def _detach_serial_fd(self):
+        self._stop_writer()
+        for device in self.outputs[1:]:
+            if device.fd is None:
+                continue
+            self.loop.remove_reader(device.fd)
+            device.fd = None
+            if device.ser.is_open:
+                device.ser.timeout = 0.01
+                device.ser.write_timeout = 0.1
+        if self._serial_fd is None:
+            return
+        self.loop.remove_reader(self._serial_fd)
+        self._serial_fd = None
+        if self.ser and self.ser.is_open:
+            self.ser.timeout = 0.01
+            self.ser.write_timeout = 0.1
+
+    def _on_udp_readable(self, source: UdpSource = None):
+        if self._drain_udp(source):
+            self._on_batch()
+
+    def _on_serial_readable(self, fd=None, buf=None):
+        if fd is None:
+            fd = self._serial_fd
+            buf = self._serial_rx
+        try:
+            chunk = os.read(fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.error(f"Serial read failed: {e}")
+            chunk = b""
+        if not chunk:
+            # EOF: the device went away; stop watching the fd.
+            self.loop.remove_reader(fd)
+            return
+        buf += chunk
+        end = buf.find(b"\n")
+        while end >= 0:
+            self._handle_feedback_line(bytes(buf[:end + 1]))
+            del buf[:end + 1]
+            end = buf.find(b"\n")
+
+    def _handle_feedback_line(self, line: bytes):
+        # ⚡ Optimized: Strip byte line before decoding to prevent creating
+        # string objects and overhead when dealing with empty/whitespace feedback lines.
+        stripped = line.strip()
+        if not stripped:
+            return False
+        if self.metrics:
+            self.metrics.feedback_lines += 1
+        decoded = stripped.decode(errors='replace')
+        logger.info(f"<- [Device Feedback] {decoded}")
+        if self.last_udp_addr:
+            (self._reply_sock or self.sock).sendto(line, self.last_udp_addr)
+        return True
+
+    def serial_to_udp_loop(self, ser=None):
+        """Reads feedback from serial (default: the primary port) and sends it back to the last UDP client"""
         while self.running:
-            if not self.dummy and self.ser and self.ser.is_open:
+            port = ser or self.ser
+            if not self.dummy and port and port.is_open:
                 try:
-                    line = self.ser.readline()
-                    if line:
-                        # ⚡ Optimized: Strip byte line before decoding to prevent creating
-                        # string objects and overhead when dealing with empty/whitespace feedback lines.
-                        stripped = line.strip()
-                        if stripped:
-                            decoded = stripped.decode(errors='replace')
-                            logger.info(f"<- [Device Feedback] {decoded}")
-                            if self.last_udp_addr:
-                                self.sock.sendto(line, self.last_udp_addr)
-                            # ⚡ Optimized: If a line was read, immediately continue to drain the buffer
-                            # without artificial delay, maximizing feedback throughput.
-                            continue
+                    line = port.readline()
+                    if line and self._handle_feedback_line(line):
+                        # ⚡ Optimized: If a line was read, immediately continue to drain the buffer
+                        # without artificial delay, maximizing feedback throughput.
+                        continue
                 except Exception:
                     # Prevent a tight busy-loop if hardware suddenly disconnects or raises
                     # persistent read exceptions instead of timing out normally.
@@ -258,41 +2091,80 @@ class UdpToSerialRelay:
 
     def cleanup(self):
         self.running = False
+        self._stop_writer()
         if self.ser:
             self.send_serial_cmd("V00000")
-            self.ser.close()
-        if self.sock:
-            self.sock.close()
+        self._close_connections()
+        if self.metrics:
+            logger.info(f"Metrics: {self.metrics.summary()}")
+        if self.capture:
+            logger.info(f"Captured {self.capture.records} datagrams to {self.capture_path}")
+            self.capture.close()
+            self.capture = None
 
 class TextHandler(logging.Handler):
-    def __init__(self, text_widget, hide_pos=True):
+    """Log pane sink: a bounded ring of pending lines, drained into the widget in capped steps.
+
+    Records arrive from the log listener thread into a `deque` of at most
+    `max_lines`; every 100 ms the Tk loop inserts up to `max_insert` of them and
+    trims the widget back to `max_lines`. If the Tk loop stalls or the pane is
+    paused, the ring drops its oldest lines instead of growing, and a marker
+    line says how many were lost. The view only follows new lines while it is
+    scrolled to the bottom, so scrolling up works as a scroll lock.
+    """
+    def __init__(self, text_widget, hide_pos=True, max_lines: int = 1000, max_insert: int = 200):
         super().__init__()
         self.text_widget = text_widget
         self.hide_pos = hide_pos
-        self.log_queue = []
+        self.max_lines = max_lines
+        self.max_insert = max_insert
+        self.paused = False
+        self.log_queue = deque(maxlen=max_lines)
+        self.dropped = 0
+        # Lines currently in the widget, tracked here instead of querying Tk.
+        self._lines = 0
         self._flush_lock = threading.Lock()
         self._schedule_flush()
 
     def emit(self, record):
-        msg = self.format(record)
-        # Filter high-frequency position update logs to keep the interface clean
-        if self.hide_pos and ("->" in msg) and ("L0" in msg or "R1" in msg):
+        # Filter high-frequency position update logs to keep the interface clean.
+        # Decided on the record attribute, so hidden records are never formatted.
+        if self.hide_pos and getattr(record, "position", False):
             return
+        msg = self.format(record)
         with self._flush_lock:
+            if len(self.log_queue) == self.max_lines:
+                self.dropped += 1
             self.log_queue.append(msg)
 
-    def _schedule_flush(self):
-        if not self.text_widget.winfo_exists(): return
+    def _take(self):
+        """Up to `max_insert` pending lines, led by a marker if any were dropped."""
         with self._flush_lock:
-            if self.log_queue:
-                self.text_widget.configure(state='normal')
-                self.text_widget.insert(tk.END, "\n".join(self.log_queue) + "\n")
-                if int(self.text_widget.index('end-1c').split('.')[0]) > 500:
-                    self.text_widget.delete('1.0', '100.0')
-                self.text_widget.configure(state='disabled')
-                self.text_widget.see(tk.END)
-                self.log_queue.clear()
-        self.text_widget.after(100, self._schedule_flush)
+            pending = self.log_queue
+            batch = [pending.popleft() for _ in range(min(self.max_insert, len(pending)))]
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            batch.insert(0, f"... {dropped} log lines dropped ...")
+        return batch
+
+    def _schedule_flush(self):
+        widget = self.text_widget
+        if not widget.winfo_exists(): return
+        batch = None if self.paused else self._take()
+        if batch:
+            at_bottom = widget.yview()[1] >= 0.999
+            text = "\n".join(batch) + "\n"
+            widget.configure(state='normal')
+            widget.insert(tk.END, text)
+            self._lines += text.count("\n")
+            excess = self._lines - self.max_lines
+            if excess > 0:
+                widget.delete('1.0', f'{excess + 1}.0')
+                self._lines -= excess
+            widget.configure(state='disabled')
+            if at_bottom:
+                widget.see(tk.END)
+        widget.after(100, self._schedule_flush)
 
 class RelayGUI:
     def __init__(self, root):
@@ -316,6 +2188,10 @@ class RelayGUI:
         ttk.Label(row0, text=":").pack(side="left")
         self.udp_port = tk.IntVar(value=8000)
         ttk.Entry(row0, textvariable=self.udp_port, width=6).pack(side="left", padx=2)
+        # A second sender (e.g. a live controller) that overrides the main one while active
+        ttk.Label(row0, text="Override Port (0 = off):").pack(side="left", padx=(10,0))
+        self.override_port = tk.IntVar(value=0)
+        ttk.Entry(row0, textvariable=self.override_port, width=6).pack(side="left", padx=2)
         
         # Serial Port
         row1 = ttk.Frame(settings_frame)
@@ -330,11 +2206,34 @@ class RelayGUI:
         self.baud_rate = tk.IntVar(value=921600)
         ttk.Entry(row1, textvariable=self.baud_rate, width=10).pack(side="left", padx=2)
 
+        # Second device and axis routing (e.g. "L0>A:L0, L1>B:L0")
+        row_devices = ttk.Frame(settings_frame)
+        row_devices.pack(fill="x", padx=5, pady=2)
+        ttk.Label(row_devices, text="Device B Port:").pack(side="left")
+        self.serial_port_b = tk.StringVar()
+        ttk.Entry(row_devices, textvariable=self.serial_port_b, width=12).pack(side="left", padx=5)
+        ttk.Label(row_devices, text="Routes:").pack(side="left", padx=(10,0))
+        self.routes = tk.StringVar()
+        ttk.Entry(row_devices, textvariable=self.routes, width=30).pack(side="left", padx=2)
+
+        row_capture = ttk.Frame(settings_frame)
+        row_capture.pack(fill="x", padx=5, pady=2)
+        ttk.Label(row_capture, text="Capture UDP to (empty = off):").pack(side="left")
+        self.capture_path = tk.StringVar()
+        ttk.Entry(row_capture, textvariable=self.capture_path, width=30).pack(side="left", padx=5)
+        self.stage_metrics = tk.BooleanVar(value=False)
+        ttk.Checkbutton(row_capture, text="Stage metrics", variable=self.stage_metrics).pack(side="left", padx=10)
+        ttk.Label(row_capture, text="Metrics Port (asyncio, empty = off):").pack(side="left", padx=(10,0))
+        self.metrics_port = tk.StringVar()
+        ttk.Entry(row_capture, textvariable=self.metrics_port, width=6).pack(side="left", padx=2)
+
         # Options
         row2 = ttk.Frame(settings_frame)
         row2.pack(fill="x", padx=5, pady=2)
         self.hide_pos = tk.BooleanVar(value=True)
         ttk.Checkbutton(row2, text="Hide high-frequency position logs", variable=self.hide_pos, command=self.update_log_filter).pack(side="left")
+        self.pause_log = tk.BooleanVar(value=False)
+        ttk.Checkbutton(row2, text="Pause log", variable=self.pause_log, command=self.update_log_filter).pack(side="left", padx=10)
         self.dummy_mode = tk.BooleanVar(value=False)
         ttk.Checkbutton(row2, text="Dummy Mode", variable=self.dummy_mode).pack(side="left", padx=10)
 
@@ -346,9 +2245,38 @@ class RelayGUI:
         ttk.Label(row2, text="Port:").pack(side="left")
         self.ws_port = tk.IntVar(value=8765)
         ttk.Entry(row2, textvariable=self.ws_port, width=6).pack(side="left", padx=2)
+        ttk.Label(row2, text="Hz:").pack(side="left")
+        self.ws_rate = tk.DoubleVar(value=60)
+        ttk.Entry(row2, textvariable=self.ws_rate, width=4).pack(side="left", padx=2)
 
         self.ws_server = None
 
+        # Engine
+        row_engine = ttk.Frame(settings_frame)
+        row_engine.pack(fill="x", padx=5, pady=2)
+        self.use_asyncio = tk.BooleanVar(value=False)
+        ttk.Checkbutton(row_engine, text="Asyncio Engine", variable=self.use_asyncio).pack(side="left")
+        ttk.Label(row_engine, text="Output Rate (Hz, 0 = immediate):").pack(side="left", padx=(10,0))
+        self.output_rate = tk.DoubleVar(value=0)
+        ttk.Entry(row_engine, textvariable=self.output_rate, width=6).pack(side="left", padx=2)
+        self.delta_output = tk.BooleanVar(value=False)
+        ttk.Checkbutton(row_engine, text="Send changed axes only", variable=self.delta_output).pack(side="left", padx=10)
+        ttk.Label(row_engine, text="Interpolation:").pack(side="left")
+        self.interpolation = tk.StringVar(value="off")
+        ttk.Combobox(row_engine, textvariable=self.interpolation, values=("off",) + AxisInterpolator.MODES,
+                     width=7, state="readonly").pack(side="left", padx=2)
+
+        row_jitter = ttk.Frame(settings_frame)
+        row_jitter.pack(fill="x", padx=5, pady=2)
+        ttk.Label(row_jitter, text="Jitter Buffer (ms, 0 = off):").pack(side="left")
+        self.jitter_ms = tk.DoubleVar(value=0)
+        ttk.Entry(row_jitter, textvariable=self.jitter_ms, width=6).pack(side="left", padx=2)
+        self.adaptive_jitter = tk.BooleanVar(value=False)
+        ttk.Checkbutton(row_jitter, text="Adaptive", variable=self.adaptive_jitter).pack(side="left", padx=10)
+        ttk.Label(row_jitter, text="I/S Merge (e.g. L0=velocity):").pack(side="left", padx=(10,0))
+        self.merge_policies = tk.StringVar()
+        ttk.Entry(row_jitter, textvariable=self.merge_policies, width=20).pack(side="left", padx=2)
+
         # Live Control
         cmd_frame = ttk.LabelFrame(root, text="Live Control")
         cmd_frame.pack(fill="x", padx=10, pady=5)
@@ -381,13 +2309,15 @@ class RelayGUI:
 
         self.handler = TextHandler(self.log_text, hide_pos=self.hide_pos.get())
         self.handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', datefmt='%H:%M:%S'))
-        logger.addHandler(self.handler)
-        logger.addHandler(logging.StreamHandler())
+        # The relay thread only enqueues records; a listener thread formats and displays them.
+        self.log_listener = start_log_listener(self.handler, logging.StreamHandler())
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.refresh_ports()
 
     def update_log_filter(self):
         self.handler.hide_pos = self.hide_pos.get()
+        self.handler.paused = self.pause_log.get()
 
     def refresh_ports(self):
         ports = serial.tools.list_ports.comports()
@@ -402,16 +2332,47 @@ class RelayGUI:
             self.cmd_input.set("")
 
     def start_service(self):
+        use_asyncio = self.use_asyncio.get()
         if self.enable_ws.get():
-            self.ws_server = TCodeWSServer(port=self.ws_port.get(), host=self.ws_host.get())
-            self.ws_server.start()
-
-        self.relay = UdpToSerialRelay(
-            self.udp_ip.get(), self.udp_port.get(),
-            self.serial_port.get(), self.baud_rate.get(),
-            self.dummy_mode.get(), verbose=True,
-            ws_server=self.ws_server
-        )
+            self.ws_server = TCodeWSServer(port=self.ws_port.get(), host=self.ws_host.get(),
+                                           broadcast_rate_hz=self.ws_rate.get())
+            # The asyncio engine starts the WS server on its own loop.
+            if not use_asyncio:
+                self.ws_server.start()
+
+        # Interpolation renders at the output rate, so it is only offered with one.
+        interpolation = self.interpolation.get() if self.interpolation.get() != "off" and self.output_rate.get() > 0 else None
+        try:
+            self.relay = UdpToSerialRelay(
+                self.udp_ip.get(), self.udp_port.get(),
+                self.serial_port.get(), self.baud_rate.get(),
+                self.dummy_mode.get(), verbose=True,
+                ws_server=self.ws_server, use_asyncio=use_asyncio,
+                output_rate_hz=self.output_rate.get(),
+                # Changed-only output still resends every axis once a second.
+                delta_output=self.delta_output.get(), full_refresh_interval=1.0 if self.delta_output.get() else 0,
+                devices={"B": self.serial_port_b.get()} if self.serial_port_b.get() else None,
+                routes=self.routes.get() or None,
+                sources=[(self.udp_ip.get(), self.override_port.get(), 1)] if self.override_port.get() else None,
+                interpolation=interpolation,
+                # Like interpolation, playout happens on output ticks.
+                jitter_delay=self.jitter_ms.get() / 1000 if self.output_rate.get() > 0 else 0,
+                adaptive_jitter=self.adaptive_jitter.get() and self.output_rate.get() > 0,
+                # Interpolation does its own timing, so I/S policies only apply without it.
+                merge_policies=self.merge_policies.get() or None if interpolation is None else None,
+                capture_path=self.capture_path.get() or None,
+                metrics=self.stage_metrics.get(),
+                # The endpoint is served from the asyncio engine's loop.
+                metrics_port=int(self.metrics_port.get()) if self.metrics_port.get().strip() and use_asyncio else None
+            )
+        except ValueError as e:
+            # Malformed routes, merge policies or metrics port: report them in the log pane and stay stopped.
+            logger.error(f"Invalid settings: {e}")
+            self.relay = None
+            if self.ws_server:
+                self.ws_server.stop()
+                self.ws_server = None
+            return
         self.thread = threading.Thread(target=self.run_relay_thread, daemon=True)
         self.thread.start()
         self.start_btn.config(state="disabled")
@@ -427,6 +2388,12 @@ class RelayGUI:
             self.ws_server.stop()
             self.ws_server = None
 
+    def on_close(self):
+        self.stop_service()
+        # Records must not reach the log pane once its widget is destroyed.
+        stop_log_listener(self.log_listener)
+        self.root.destroy()
+
     def reset_ui(self):
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
@@ -0,0 +1,189 @@
+"""Drift-free waveform generator for driving two OSR devices in phase.
+
+Replaces the per-tick `math.sin` / f-string / `time.time()` sleep loop of the
+dual-OSR controller: every motion mode is precomputed once per parameter change
+into tables of ready-to-write T-Code frames (one per phase step and device),
+and ticks are scheduled on absolute `time.perf_counter()` deadlines, so timing
+errors never accumulate over long sessions.
+"""
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MOTION_MODES = ("walk", "squeeze_rub", "ankle_massage", "stepping", "twisting")
+# Phase steps per motion cycle; at 1 Hz and 50 Hz ticks that is ~20 steps of headroom per tick.
+TABLE_SIZE = 1024
+# Zero-padded encodings of every 4-digit position
+_DIGITS = [b"%04d" % value for value in range(10000)]
+
+
+def _wave(func, phases):
+    return [func(p) for p in phases]
+
+
+def _positions(center, amp, wave):
+    """center + amp * wave, truncated and clamped to the 4-digit T-Code range."""
+    return [min(max(int(center + amp * w), 0), 9999) for w in wave]
+
+
+def build_mode_tables(mode: str, stroke: float = 50.0, base_squeeze: float = 50.0, phase_shift: float = 180,
+                      pitch_amp: float = 50.0, roll_amp: float = 50.0, twist_amp: float = 50.0,
+                      interval_ms: int = 20, size: int = TABLE_SIZE):
+    """Precomputes one cycle of `mode` as encoded frames for device A and device B.
+
+    Amplitudes and offsets are percentages as in the controller GUI;
+    `phase_shift` (degrees) offsets device B against device A. Returns two lists
+    of `size` newline-terminated byte frames, indexed by phase step.
+    """
+    if mode not in MOTION_MODES:
+        raise ValueError(f"Unknown motion mode: {mode!r}")
+    # Amplitudes (0-5000) and centers (0-9999)
+    amp_l0 = (stroke / 100.0) * 5000
+    amp_r2 = (pitch_amp / 100.0) * 5000
+    amp_r1 = (roll_amp / 100.0) * 5000
+    amp_r0 = (twist_amp / 100.0) * 5000
+    center_l0 = (base_squeeze / 100.0) * 9999
+    center_rx = 5000
+    # Clamp L0 so the stroke stays inside the range
+    if center_l0 - amp_l0 < 0: center_l0 = amp_l0
+    if center_l0 + amp_l0 > 9999: center_l0 = 9999 - amp_l0
+
+    step = 2 * math.pi / size
+    shift = math.radians(phase_shift)
+    # Tables are built once per parameter change, so plain lists are fast enough.
+    phase_a = [i * step for i in range(size)]
+    phase_b = [p + shift for p in phase_a]
+
+    sin_a, sin_b = _wave(math.sin, phase_a), _wave(math.sin, phase_b)
+    # (axis, device A positions, device B positions)
+    if mode == "walk":
+        axes = [(b"L0", _positions(center_l0, amp_l0, sin_a), _positions(center_l0, amp_l0, sin_b))]
+    elif mode == "squeeze_rub":
+        # Sync L0 squeeze, alternating R2 pitch
+        l0 = _positions(center_l0, amp_l0, sin_a)
+        axes = [(b"L0", l0, l0),
+                (b"R2", _positions(center_rx, amp_r2, sin_a), _positions(center_rx, amp_r2, sin_b))]
+    elif mode == "ankle_massage":
+        # Hold L0 squeeze, alternating R1 roll
+        l0 = [min(int(center_l0), 9999)] * size
+        axes = [(b"L0", l0, l0),
+                (b"R1", _positions(center_rx, amp_r1, sin_a), _positions(center_rx, amp_r1, sin_b))]
+    elif mode == "stepping":
+        # Alternating L0 and R2; pitch follows the stroke (toe points down when pushing out)
+        cos_a, cos_b = _wave(math.cos, phase_a), _wave(math.cos, phase_b)
+        axes = [(b"L0", _positions(center_l0, amp_l0, sin_a), _positions(center_l0, amp_l0, sin_b)),
+                (b"R2", _positions(center_rx, amp_r2, cos_a), _positions(center_rx, amp_r2, cos_b))]
+    else:
+        # twisting: alternating R0 twist and R1 roll, gentle L0 sync
+        cos_a, cos_b = _wave(math.cos, phase_a), _wave(math.cos, phase_b)
+        l0 = _positions(center_l0, amp_l0 * 0.5, sin_a)
+        axes = [(b"L0", l0, l0),
+                (b"R0", _positions(center_rx, amp_r0, sin_a), _positions(center_rx, amp_r0, sin_b)),
+                (b"R1", _positions(center_rx, amp_r1, cos_a), _positions(center_rx, amp_r1, cos_b))]
+
+    # ⚡ Encoded once here; the tick loop only indexes and writes.
+    suffix = b" I%d\n" % interval_ms
+    digits = _DIGITS
+    frames_a = []
+    frames_b = []
+    for i in range(size):
+        frames_a.append(b" ".join(name + digits[a[i]] for name, a, _ in axes) + suffix)
+        frames_b.append(b" ".join(name + digits[b[i]] for name, _, b in axes) + suffix)
+    return frames_a, frames_b
+
+
+class WaveformEngine:
+    """Streams a motion mode to two devices on absolute `perf_counter` deadlines.
+
+    `send_a` / `send_b` take one encoded frame (e.g. `ser.write`). Tick `k` is
+    due at `start + k / rate_hz` and plays phase `k * speed / rate_hz` cycles,
+    so neither the cadence nor the phase drifts, however long the session. A
+    late tick (stall, GC pause) is skipped rather than sent in a burst.
+    """
+    def __init__(self, send_a, send_b, rate_hz: float = 50, mode: str = "walk", speed: float = 1.0,
+                 clock=time.perf_counter, sleep=time.sleep, **shape):
+        self.send_a = send_a
+        self.send_b = send_b
+        self.rate_hz = rate_hz
+        self.speed = speed
+        self.clock = clock
+        self.sleep = sleep
+        self.mode = mode
+        self.shape = shape
+        self.tables = None
+        # Phase (in cycles) at a tick; re-anchored on speed changes so the motion never jumps.
+        self._anchor = (0, 0.0)
+        self.tick = 0
+        self.ticks_sent = 0
+        self.ticks_skipped = 0
+        self.running = False
+        self.thread = None
+        self.configure()
+
+    def configure(self, mode: str = None, speed: float = None, **shape):
+        """Changes the mode, speed or shape (stroke, phase_shift, ...); takes effect on the next tick."""
+        if speed is not None:
+            self._anchor = (self.tick, self._phase(self.tick))
+            self.speed = speed
+        if self.tables is not None and mode is None and not shape:
+            # Speed only moves the phase; the tables stay valid.
+            return
+        if mode is not None:
+            self.mode = mode
+        self.shape.update(shape)
+        interval_ms = int(round(1000 / self.rate_hz))
+        # Swapped in one assignment, so the tick thread never sees half-built tables.
+        self.tables = build_mode_tables(self.mode, interval_ms=interval_ms, **self.shape)
+
+    def _phase(self, tick: int) -> float:
+        anchor_tick, anchor_phase = self._anchor
+        return (anchor_phase + (tick - anchor_tick) * self.speed / self.rate_hz) % 1.0
+
+    def frames_at(self, tick: int):
+        """The (device A, device B) frames for tick number `tick`."""
+        frames_a, frames_b = self.tables
+        size = len(frames_a)
+        index = int(self._phase(tick) * size) % size
+        return frames_a[index], frames_b[index]
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def run(self):
+        clock = self.clock
+        sleep = self.sleep
+        period = 1.0 / self.rate_hz
+        start = clock()
+        tick = self.tick = 0
+        self._anchor = (0, 0.0)
+        self.running = True
+        while self.running:
+            deadline = start + tick * period
+            delay = deadline - clock()
+            if delay > 0:
+                sleep(delay)
+            elif delay < -period:
+                # Fell behind: jump to the current tick instead of bursting to catch up.
+                behind = int(-delay / period)
+                tick += behind
+                self.ticks_skipped += behind
+            frame_a, frame_b = self.frames_at(tick)
+            try:
+                self.send_a(frame_a)
+                self.send_b(frame_b)
+            except Exception as e:
+                logger.error(f"Waveform send failed: {e}")
+            self.ticks_sent += 1
+            tick += 1
+            self.tick = tick